@@ -2,44 +2,108 @@ import os
 import logging
 from flask import Flask, render_template
 from werkzeug.middleware.proxy_fix import ProxyFix
-from extensions import db
+from extensions import db, cache, user_cache
 
 def create_app():
     """Application factory pattern"""
     app = Flask(__name__)
     
-    # Configure logging for debugging
-    logging.basicConfig(level=logging.DEBUG)
+    # LOG_LEVEL=DEBUG for verbose output while developing
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
     
     # Configuration
     app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    # Number of proxies in front that append to X-Forwarded-* (1 on Replit; 2 with a
+    # CDN before nginx; 0 when clients connect directly). remote_addr becomes the
+    # client address those proxies saw, which the rate limiter keys on
+    app.config['PROXY_HOPS'] = int(os.environ.get('PROXY_HOPS', 1))
+    if app.config['PROXY_HOPS']:
+        hops = app.config['PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
     
     # Configure WTF CSRF
     app.config['WTF_CSRF_ENABLED'] = True
     
-    # Database configuration - Using SQLite
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///portfolio.db"
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_recycle": 300,
-        "pool_pre_ping": True,
-    }
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    
-    # Upload configuration
-    UPLOAD_FOLDER = 'static/uploads'
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
-    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    # Upload configuration; storage.py creates directories as files arrive
+    app.config['UPLOAD_FOLDER'] = os.path.join(app.static_folder, 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     
+    # Shared caches (CDN/nginx) may serve anonymous public pages for this many seconds
+    app.config['PUBLIC_CACHE_MAX_AGE'] = int(os.environ.get('PUBLIC_CACHE_MAX_AGE', 60))
+    
+    # Coalesce like toggles in memory and write them in batches
+    app.config['LIKE_BUFFER_ENABLED'] = os.environ.get('LIKE_BUFFER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    
+    # Seconds a cached user snapshot is trusted; changes made through this worker apply at once
+    app.config['CURRENT_USER_TTL'] = int(os.environ.get('CURRENT_USER_TTL', 30))
+    
+    # Check the schema stamp at boot and run init_db when it is missing or behind.
+    # Set to 0 when deploys run `flask init-db` themselves.
+    app.config['DB_AUTO_INIT'] = os.environ.get('DB_AUTO_INIT', '1').lower() in ('1', 'true', 'yes')
+    
+    # Origin for absolute links in emails. Never taken from the request: ProxyFix
+    # trusts X-Forwarded-Host, which any client can set
+    replit_domain = os.environ.get('REPLIT_DOMAINS', '').split(',')[0]
+    app.config['PUBLIC_BASE_URL'] = os.environ.get(
+        'PUBLIC_BASE_URL', f'https://{replit_domain}' if replit_domain else 'http://localhost:5000').rstrip('/')
+    
+    # werkzeug hash method; stored hashes with other parameters are upgraded on login
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    
     # Initialize extensions
-    db.init_app(app)
+    # Database engines come from DATABASE_URL (SQLite by default), see database.py
+    from database import init_database
+    init_database(app)
+    cache.init_app(app)
+    user_cache.init_app(app)
+    
+    # Token buckets for the write endpoints; RATELIMIT_BACKEND=redis shares them between workers
+    from ratelimit import rate_limiter
+    rate_limiter.init_app(app)
+    
+    from storage import upload_store
+    upload_store.init_app(app)
+    
+    from likes import like_buffer
+    like_buffer.init_app(app)
+    
+    from trending import trending_ranker
+    trending_ranker.init_app(app)
+    
+    from notifications import notification_queue
+    notification_queue.init_app(app)
+    
+    from counters import counter_reconciler
+    counter_reconciler.init_app(app)
+    
+    from pubsub import broker
+    broker.init_app(app)
+    
+    from images import image_pipeline
+    image_pipeline.init_app(app)
+    
+    from assets import assets
+    assets.init_app(app)
+    
+    # Outgoing email is queued in the database and sent by a background thread
+    from mail import mail_outbox
+    mail_outbox.init_app(app)
+    
+    from passwords import password_hasher
+    password_hasher.init_app(app)
+    
+    # Latency/SQL/template timings at /metrics and in Server-Timing headers
+    from metrics import metrics
+    metrics.init_app(app)
     
     # Import and register blueprints
     from routes import main_bp
     app.register_blueprint(main_bp)
     
+    # Maintenance commands (flask <command>)
+    from commands import register_commands
+    register_commands(app)
+    
     # Error handlers
     @app.errorhandler(404)
     def page_not_found(error):
@@ -52,9 +116,17 @@ def create_app():
         app.logger.error(f"Internal server error: {error}")
         return render_template('500.html'), 500
     
-    # Create tables within app context
+    # Schema setup is a one-shot job; once `flask init-db` (or a first boot) has
+    # stamped the database, workers only read the stamp
+    if app.config['DB_AUTO_INIT']:
+        with app.app_context():
+            from schema import schema_is_current, init_db
+            if not schema_is_current():
+                init_db()
+    
+    # Don't hand connections opened here to workers forked by gunicorn --preload
     with app.app_context():
-        import models  # noqa: F401
-        db.create_all()
+        for engine in db.engines.values():
+            engine.dispose()
     
     return app
\ No newline at end of file
@@ -1,7 +1,6 @@
 from __init__ import create_app
 
-# Create the app instance
-app = create_app()
+# `flask --app app <command>` finds the create_app factory; gunicorn serves main:app
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from flask import request, send_from_directory
+
+# Sources that get fingerprinted, relative to the static folder
+ASSET_DIRS = ('css', 'js')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE_TYPES = ('text/html', 'text/plain', 'text/css', 'application/json', 'application/javascript')
+
+# Content-addressed uploads (see storage.py) never change either
+_HASHED_UPLOAD = re.compile(r'^uploads/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}')
+
+
+def build_assets(static_folder):
+    """Copy css/js to dist/ under content-hashed names with .gz/.br siblings; returns the manifest"""
+    try:
+        import brotli
+    except ImportError:  # Optional: only .gz siblings are built without it
+        brotli = None
+
+    dist = os.path.join(static_folder, DIST_DIR)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(static_folder, asset_dir)):
+            for filename in sorted(filenames):
+                source = os.path.join(dirpath, filename)
+                logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+                with open(source, 'rb') as f:
+                    data = f.read()
+
+                stem, ext = os.path.splitext(logical)
+                built = f'{DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+                target = os.path.join(static_folder, built)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(data)
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(brotli.compress(data, quality=11))
+                manifest[logical] = built
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class Assets:
+    """Resolves url_for('static') through the build manifest and serves precompressed files"""
+
+    def __init__(self):
+        self.manifest = {}
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        self.app = app
+        self.load_manifest()
+        # Part of every page ETag (http_cache.make_etag); BUILD_ID=<commit> pins it
+        app.config.setdefault('BUILD_ID', os.environ.get('BUILD_ID') or self.build_id())
+
+        app.url_defaults(self._fingerprint)
+        app.view_functions['static'] = self.serve_static
+        app.after_request(self.compress_response)
+
+    def load_manifest(self):
+        path = os.path.join(self.app.static_folder, DIST_DIR, MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    def build_id(self):
+        """Hash of the asset manifest and the templates: changes whenever a deploy changes the HTML"""
+        digest = hashlib.sha256(json.dumps(self.manifest, sort_keys=True).encode())
+        template_folder = os.path.join(self.app.root_path, self.app.template_folder)
+        for dirpath, dirnames, filenames in os.walk(template_folder):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                digest.update(os.path.relpath(path, template_folder).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        return digest.hexdigest()[:12]
+
+    def _fingerprint(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.manifest:
+            values['filename'] = self.manifest[values['filename']]
+
+    def serve_static(self, filename):
+        """Static view: immutable caching for hashed files, .br/.gz picked by Accept-Encoding"""
+        static_folder = self.app.static_folder
+        if filename.startswith(DIST_DIR + '/'):
+            accepted = request.accept_encodings
+            for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+                if accepted[encoding] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+                    response = send_from_directory(static_folder, filename + suffix,
+                                                   mimetype=mimetypes.guess_type(filename)[0])
+                    response.headers['Content-Encoding'] = encoding
+                    break
+            else:
+                response = send_from_directory(static_folder, filename)
+            response.vary.add('Accept-Encoding')
+            response.headers['Cache-Control'] = IMMUTABLE
+            return response
+
+        response = send_from_directory(static_folder, filename)
+        if _HASHED_UPLOAD.match(filename):
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+    def compress_response(self, response):
+        """gzip dynamic text responses for clients that accept it"""
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES
+                or not request.accept_encodings['gzip']):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        response.set_data(gzip.compress(data, compresslevel=self.app.config['COMPRESS_LEVEL']))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+assets = Assets()
@@ -1,17 +1,62 @@
+from collections import namedtuple
 from functools import wraps
-from flask import session, redirect, url_for, flash, request
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app, g, session, redirect, url_for, flash, request
+from sqlalchemy import event, select
+from extensions import db, user_cache
+from models import User
 import secrets
-import smtplib
-from email.mime.text import MIMEText
+
+# What requests need to know about the logged-in user; cached between requests
+CurrentUser = namedtuple('CurrentUser', 'id nome email is_admin')
+
+def _version_key(user_id):
+    return f'user:{user_id}:version'
+
+def invalidate_user(user_id):
+    """Give the user a new version stamp so cached snapshots of them are skipped"""
+    user_cache.set(_version_key(user_id), secrets.token_hex(4), ttl=0)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    invalidate_user(target.id)
+
+def load_user(user_id):
+    """Snapshot of a user from the cache, falling back to one narrow query"""
+    version = user_cache.get(_version_key(user_id))
+    if version is None:
+        invalidate_user(user_id)
+        version = user_cache.get(_version_key(user_id))
+    
+    key = f'user:{user_id}:{version}'
+    user = user_cache.get(key)
+    if user is None:
+        row = db.session.execute(
+            select(User.id, User.nome, User.email, User.is_admin).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        user = CurrentUser(*row)
+        user_cache.set(key, user, ttl=current_app.config['CURRENT_USER_TTL'])
+    return user
+
+def get_current_user():
+    """The logged-in user for this request, loaded at most once"""
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        g.current_user = load_user(user_id) if user_id is not None else None
+        if user_id is not None and g.current_user is None:
+            # The account is gone; drop the stale login
+            session.clear()
+    return g.current_user
 
 def login_required(f):
     """Decorator to require login for protected routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if get_current_user() is None:
             flash('Você precisa estar logado para acessar esta página.', 'warning')
-            return redirect(url_for('login', next=request.url))
+            return redirect(url_for('main.login', next=request.url))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -19,14 +64,12 @@ def admin_required(f):
     """Decorator to require admin privileges"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        user = get_current_user()
+        if user is None:
             flash('Você precisa estar logado para acessar esta página.', 'warning')
-            return redirect(url_for('login', next=request.url))
+            return redirect(url_for('main.login', next=request.url))
         
-        from models import User
-        from app import db
-        user = db.session.get(User, session['user_id'])
-        if not user or not user.is_admin:
+        if not user.is_admin:
             flash('Acesso negado. Apenas administradores podem acessar esta página.', 'danger')
             return redirect(url_for('main.index'))
         return f(*args, **kwargs)
@@ -37,27 +80,17 @@ def generate_password_reset_token():
     return secrets.token_urlsafe(32)
 
 def send_password_reset_email(email, token):
-    """Simulate sending password reset email (print to console)"""
-    reset_link = f"http://localhost:5000/reset-password/{token}"
-    
-    print("=" * 60)
-    print("EMAIL DE RECUPERAÇÃO DE SENHA")
-    print("=" * 60)
-    print(f"Para: {email}")
-    print(f"Assunto: Redefinir sua senha")
-    print()
-    print("Olá,")
-    print()
-    print("Você solicitou a redefinição de sua senha.")
-    print("Clique no link abaixo para criar uma nova senha:")
-    print()
-    print(f"Link: {reset_link}")
-    print()
-    print("Este link expira em 1 hora.")
-    print("Se você não solicitou esta redefinição, ignore este e-mail.")
-    print()
-    print("Atenciosamente,")
-    print("Equipe do Portfólio")
-    print("=" * 60)
-    
-    return True
\ No newline at end of file
+    """Queue the password reset email; it goes out once the caller commits"""
+    from mail import mail_outbox
+    reset_link = current_app.config['PUBLIC_BASE_URL'] + url_for('main.reset_password', token=token)
+    corpo = (
+        "Olá,\n\n"
+        "Você solicitou a redefinição de sua senha.\n"
+        "Clique no link abaixo para criar uma nova senha:\n\n"
+        f"{reset_link}\n\n"
+        "Este link expira em 1 hora.\n"
+        "Se você não solicitou esta redefinição, ignore este e-mail.\n\n"
+        "Atenciosamente,\n"
+        "Equipe do Portfólio"
+    )
+    mail_outbox.enqueue(email, 'Redefinir sua senha', corpo)
\ No newline at end of file
@@ -0,0 +1,282 @@
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime
+from sqlalchemy import Date, DateTime, select
+from extensions import db
+from models import User, Project, Achievement, Comment, Like
+from storage import CHUNK_SIZE, upload_store
+
+FORMAT_VERSION = 1
+DATA_MEMBER = 'portfolio.ndjson'
+UPLOADS_PREFIX = 'uploads/'
+
+# Exported in this order so every row comes after the rows it references.
+# Tags, counters, the search index and rankings are derived and rebuilt on import.
+SECTIONS = (('user', User), ('project', Project), ('achievement', Achievement),
+            ('comment', Comment), ('like', Like))
+MODELS = dict(SECTIONS)
+
+# Foreign key column -> section whose ids it holds; rewritten to the new ids on import
+REMAPPED_COLUMNS = {'user_id': 'user', 'project_id': 'project'}
+
+# Never exported: live reset tokens would let whoever holds the file take over accounts
+EXCLUDED_COLUMNS = {'user': {'reset_token', 'reset_token_expires'}}
+# Exported only on request (export-data --with-password-hashes)
+PASSWORD_COLUMNS = {'user': {'senha_hash'}}
+
+# Matches no password (check_password_hash returns False); imported users
+# without a hash set a new password through forgot-password
+UNUSABLE_PASSWORD_HASH = '!'
+
+
+class InvalidExport(ValueError):
+    """The file being imported is not something export produced"""
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} não é serializável')
+
+
+def iter_ndjson(batch_size=1000, with_password_hashes=False):
+    """Yield the dataset as NDJSON bytes, one section at a time
+
+    Rows are read through a streaming cursor batch_size at a time, so memory
+    stays flat whatever the size of the tables. Password hashes are left out
+    unless with_password_hashes is set.
+    """
+    from schema import current_version
+    header = {'type': 'meta', 'format': FORMAT_VERSION, 'schema_version': current_version(),
+              'exported_at': datetime.utcnow()}
+    yield json.dumps(header, default=_json_default).encode() + b'\n'
+
+    for section, model in SECTIONS:
+        table = model.__table__
+        skipped = EXCLUDED_COLUMNS.get(section, set())
+        if not with_password_hashes:
+            skipped = skipped | PASSWORD_COLUMNS.get(section, set())
+        columns = [column for column in table.columns if column.name not in skipped]
+        rows = db.session.execute(select(*columns).order_by(table.c.id).execution_options(yield_per=batch_size))
+        for partition in rows.partitions():
+            yield b''.join(
+                json.dumps({'type': section, 'data': row._asdict()}, default=_json_default,
+                           ensure_ascii=False).encode() + b'\n'
+                for row in partition)
+
+
+def _tar_member(name, fileobj, size):
+    """Yield one tar entry, copying fileobj in chunks"""
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(time.time())
+    info.mode = 0o644
+    yield info.tobuf(format=tarfile.PAX_FORMAT)
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+        yield chunk
+    if size % tarfile.BLOCKSIZE:
+        yield tarfile.NUL * (tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE)
+
+
+def iter_archive(batch_size=1000, with_password_hashes=False):
+    """Yield a tar with the NDJSON dataset followed by every upload it references
+
+    Tar headers carry the entry size, so the NDJSON is spooled to a temporary
+    file first; everything is then copied out in CHUNK_SIZE pieces.
+    """
+    from images import referenced_image_urls
+    with tempfile.TemporaryFile() as data:
+        for chunk in iter_ndjson(batch_size, with_password_hashes):
+            data.write(chunk)
+        size = data.tell()
+        data.seek(0)
+        yield from _tar_member(DATA_MEMBER, data, size)
+
+    for url in sorted(referenced_image_urls()):
+        key = upload_store.key_for(url)
+        if key is None or not upload_store.backend.exists(key):
+            continue
+        with upload_store.backend.open(key) as upload:
+            size = upload.seek(0, io.SEEK_END)
+            upload.seek(0)
+            yield from _tar_member(UPLOADS_PREFIX + key, upload, size)
+    # End-of-archive marker
+    yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+
+def _decoders(table):
+    """Column name -> function turning its JSON value back into a Python value"""
+    decoders = {}
+    for column in table.columns:
+        if isinstance(column.type, DateTime):
+            decoders[column.name] = datetime.fromisoformat
+        elif isinstance(column.type, Date):
+            decoders[column.name] = date.fromisoformat
+        else:
+            decoders[column.name] = None
+    return decoders
+
+
+class Importer:
+    """Inserts exported rows in batches, giving them new ids
+
+    Users are matched to existing accounts by email; every other row is
+    inserted and its user_id/project_id rewritten through the id maps built
+    while loading the sections before it.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.ids = {'user': {}, 'project': {}}
+        self.project_tags = []  # (new project id, tags string) to link once loaded
+        self.stats = Counter()
+        self._decoders = {section: _decoders(model.__table__) for section, model in SECTIONS}
+        self._section = None
+        self._batch = []
+
+    def add(self, section, data):
+        if section not in MODELS:
+            raise InvalidExport(f'Seção desconhecida: {section!r}')
+        if section != self._section or len(self._batch) >= self.batch_size:
+            self.flush()
+            self._section = section
+
+        decoders = self._decoders[section]
+        row = {}
+        for name, value in data.items():
+            if name not in decoders:
+                continue  # Column from a newer schema
+            decode = decoders[name]
+            row[name] = decode(value) if decode and value is not None else value
+        for column, target in REMAPPED_COLUMNS.items():
+            if column in row:
+                new_id = self.ids[target].get(row[column])
+                if new_id is None:
+                    self.stats[f'{section}_ignorados'] += 1
+                    return
+                row[column] = new_id
+        self._batch.append(row)
+
+    def flush(self):
+        if not self._batch:
+            return
+        section, batch = self._section, self._batch
+        self._batch = []
+        getattr(self, f'_insert_{section}', self._insert_rows)(section, batch)
+
+    def _insert_rows(self, section, batch):
+        table = MODELS[section].__table__
+        old_ids = [row.pop('id') for row in batch]
+        if section in self.ids:
+            # insertmanyvalues batches the executemany and keeps RETURNING in parameter order
+            stmt = db.insert(table).returning(table.c.id, sort_by_parameter_order=True)
+            new_ids = db.session.scalars(stmt, batch).all()
+            self.ids[section].update(zip(old_ids, new_ids))
+            if section == 'project':
+                self.project_tags.extend(zip(new_ids, (row.get('tags') for row in batch)))
+        else:
+            db.session.execute(db.insert(table), batch)
+        self.stats[section] += len(batch)
+
+    def _insert_user(self, section, batch):
+        emails = [row['email'] for row in batch]
+        existing = dict(db.session.execute(select(User.email, User.id).where(User.email.in_(emails))).all())
+        new_rows = []
+        for row in batch:
+            if row['email'] in existing:
+                self.ids['user'][row['id']] = existing[row['email']]
+                self.stats['user_existentes'] += 1
+            else:
+                if not row.get('senha_hash'):
+                    row['senha_hash'] = UNUSABLE_PASSWORD_HASH
+                    self.stats['user_sem_senha'] += 1
+                new_rows.append(row)
+        if new_rows:
+            self._insert_rows(section, new_rows)
+
+
+def _read_ndjson(lines, importer):
+    """Feed NDJSON byte lines to importer"""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise InvalidExport(f'Linha {number}: JSON inválido ({exc})') from exc
+        if record.get('type') == 'meta':
+            if record.get('format') != FORMAT_VERSION:
+                raise InvalidExport(f'Formato de exportação não suportado: {record.get("format")!r}')
+            continue
+        importer.add(record.get('type'), record.get('data') or {})
+    importer.flush()
+
+
+def _valid_upload_key(key):
+    parts = key.split('/')
+    return all(part and not part.startswith('.') for part in parts)
+
+
+def _store_upload(member, fileobj):
+    key = member.name[len(UPLOADS_PREFIX):]
+    if not member.isfile() or not _valid_upload_key(key):
+        raise InvalidExport(f'Entrada inválida no arquivo: {member.name!r}')
+    if upload_store.backend.exists(key):
+        return False  # Content-addressed: same name, same bytes
+    os.makedirs(upload_store.backend.tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=upload_store.backend.tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+                tmp.write(chunk)
+        upload_store.backend.put_file(key, tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def import_stream(stream, batch_size=1000):
+    """Load an export (NDJSON, or a tar from iter_archive, gzipped or not) from a binary stream
+
+    Rows and tag links go in one transaction; counters and the search index
+    are rebuilt afterwards. likes_count is kept as exported, since every
+    imported like belongs to a newly inserted project. Returns a Counter of
+    what was imported.
+    """
+    from tags import link_new_projects
+    from counters import recount
+    from search import rebuild_search_index
+    stream = stream if hasattr(stream, 'peek') else io.BufferedReader(stream)
+    importer = Importer(batch_size)
+    try:
+        if stream.peek(1)[:1] == b'{':
+            _read_ndjson(stream, importer)
+        else:
+            with tarfile.open(fileobj=stream, mode='r|*') as tar:
+                for member in tar:
+                    fileobj = tar.extractfile(member)
+                    if member.name == DATA_MEMBER:
+                        _read_ndjson(fileobj, importer)
+                    elif member.name.startswith(UPLOADS_PREFIX):
+                        if _store_upload(member, fileobj):
+                            importer.stats['arquivos'] += 1
+                    else:
+                        raise InvalidExport(f'Entrada inesperada no arquivo: {member.name!r}')
+        link_new_projects(importer.project_tags)
+        db.session.commit()
+    except tarfile.ReadError as exc:
+        db.session.rollback()
+        raise InvalidExport(f'Arquivo não reconhecido: {exc}') from exc
+    except BaseException:
+        db.session.rollback()
+        raise
+    recount()
+    rebuild_search_index()
+    return importer.stats
@@ -0,0 +1,347 @@
+"""Seeded load test of the main routes, with results saved as JSON
+
+Seeds a synthetic dataset through the models, then drives the routes either
+in-process through the Flask test client or over HTTP against a running
+server (e.g. gunicorn started with DATABASE_URL pointing at --db,
+RATELIMIT_ENABLED=0 and SERVER_TIMING_ENABLED=1). Reports
+throughput, p50/p90/p99 latency and SQL queries per request, the latter read
+from the Server-Timing header so both modes measure the same thing.
+
+Usage:
+    python benchmarks/load_benchmark.py [--projects 2000] [--comments 200000] ...
+    python benchmarks/load_benchmark.py --db /tmp/bench.db --reuse --url http://127.0.0.1:5000
+    python benchmarks/load_benchmark.py --compare benchmarks/results/<old>.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+WORDS = ('python flask django api rest web mobile dados dashboard portfolio sqlite postgres docker '
+         'react javascript design automação integração relatório análise segurança desempenho').split()
+TAGS = ['Python', 'Flask', 'React', 'SQL', 'Docker', 'API', 'CSS', 'ML', 'Mobile', 'DevOps']
+QUERIES_HEADER = re.compile(r'desc="(\d+) queries"')
+BATCH = 5000
+
+
+def _insert(model, rows):
+    from extensions import db
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(db.insert(model), rows[start:start + BATCH])
+
+
+def seed(args, rng):
+    """Fill an initialized database; returns the ids the scenarios pick from"""
+    from extensions import db
+    from models import User, Project, Achievement, Comment, Like, Notification
+    from tags import backfill_tags
+    from likes import reconcile_like_counts
+    from counters import recount
+    import search
+
+    now = datetime.utcnow()
+    users = [{'nome': 'Admin', 'email': 'admin@example.com', 'senha_hash': 'x', 'is_admin': True}]
+    users += [{'nome': f'Usuário {i}', 'email': f'user{i}@example.com', 'senha_hash': 'x', 'is_admin': False}
+              for i in range(args.users)]
+    _insert(User, users)
+    user_ids = list(db.session.scalars(db.select(User.id).order_by(User.id)))
+    admin_id, visitor_ids = user_ids[0], user_ids[1:]
+
+    _insert(Project, [{
+        'titulo': ' '.join(rng.choices(WORDS, k=3)).title(),
+        'descricao': ' '.join(rng.choices(WORDS, k=60)),
+        'tags': ', '.join(rng.sample(TAGS, 3)),
+        'status': 'published' if rng.random() < 0.9 else 'draft',
+        'likes_count': 0,
+        'criado_em': now - timedelta(minutes=i),
+        'atualizado_em': now - timedelta(minutes=i),
+        'user_id': admin_id,
+    } for i in range(args.projects)])
+    published = list(db.session.scalars(db.select(Project.id).where(Project.status == 'published')))
+    project_ids = list(db.session.scalars(db.select(Project.id)))
+
+    _insert(Achievement, [{
+        'titulo': f'Conquista {i}', 'descricao': ' '.join(rng.choices(WORDS, k=30)),
+        'data': now - timedelta(days=i), 'user_id': admin_id,
+    } for i in range(min(args.projects // 10, 200))])
+
+    _insert(Comment, [{
+        'conteudo': ' '.join(rng.choices(WORDS, k=12)),
+        'criado_em': now - timedelta(seconds=i),
+        'user_id': rng.choice(visitor_ids),
+        'project_id': rng.choice(published),
+    } for i in range(args.comments)])
+
+    pairs = set()
+    while len(pairs) < min(args.likes, len(visitor_ids) * len(published)):
+        pairs.add((rng.choice(visitor_ids), rng.choice(published)))
+    _insert(Like, [{'user_id': user_id, 'project_id': project_id} for user_id, project_id in pairs])
+
+    _insert(Notification, [{
+        'tipo': rng.choice(('like', 'comment')),
+        'mensagem': 'Atividade em um projeto',
+        'lida': rng.random() < 0.8,
+        'criado_em': now - timedelta(seconds=i),
+        'user_id': admin_id,
+    } for i in range(args.notifications)])
+    db.session.commit()
+
+    backfill_tags()
+    reconcile_like_counts()
+    recount()
+    search.rebuild_search_index()
+    db.session.commit()
+    return {'admin_id': admin_id, 'visitor_ids': visitor_ids, 'published': published,
+            'project_ids': project_ids}
+
+
+def load_ids():
+    """Ids for the scenarios from an already seeded database"""
+    from extensions import db
+    from models import User, Project
+    return {
+        'admin_id': db.session.scalar(db.select(User.id).where(User.is_admin.is_(True)).limit(1)),
+        'visitor_ids': list(db.session.scalars(db.select(User.id).where(User.is_admin.is_(False)))),
+        'published': list(db.session.scalars(db.select(Project.id).where(Project.status == 'published'))),
+        'project_ids': list(db.session.scalars(db.select(Project.id))),
+    }
+
+
+def session_cookie(app, user_id):
+    """A signed session for user_id with a CSRF token, as the app itself would issue"""
+    from flask import session
+    from flask_wtf.csrf import generate_csrf
+    with app.test_request_context():
+        session['user_id'] = user_id
+        token = generate_csrf()
+        value = app.session_interface.get_signing_serializer(app).dumps(dict(session))
+    return value, token
+
+
+def scenarios(ids):
+    """name -> (method, path factory, form factory or None, who)"""
+    published = ids['published']
+    return {
+        'home': ('GET', lambda rng: '/', None, 'anonymous'),
+        'project_detail': ('GET', lambda rng: f'/project/{rng.choice(published)}', None, 'anonymous'),
+        'toggle_like': ('POST', lambda rng: f'/project/{rng.choice(published)}/like', lambda rng: {}, 'visitor'),
+        'add_comment': ('POST', lambda rng: f'/project/{rng.choice(published)}/comment',
+                        lambda rng: {'conteudo': ' '.join(rng.choices(WORDS, k=8))}, 'visitor'),
+        'admin_dashboard': ('GET', lambda rng: '/admin', None, 'admin'),
+        'admin_projects': ('GET', lambda rng: '/admin/projects', None, 'admin'),
+        'admin_notifications': ('GET', lambda rng: '/admin/notifications', None, 'admin'),
+    }
+
+
+class ClientTarget:
+    """Sends requests through the app's test client, one client per thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie_name = app.config['SESSION_COOKIE_NAME']
+        self._local = threading.local()
+
+    def request(self, method, path, data, cookie):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client(use_cookies=False)
+        headers = {'Cookie': f'{self.cookie_name}={cookie}'} if cookie else {}
+        response = client.open(path, method=method, data=data, headers=headers)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class HttpTarget:
+    """Sends requests to a running server"""
+
+    def __init__(self, base_url, cookie_name):
+        self.base_url = base_url.rstrip('/')
+        self.cookie_name = cookie_name
+        self.opener = urllib.request.build_opener(_NoRedirect)
+
+    def request(self, method, path, data, cookie):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        if cookie:
+            req.add_header('Cookie', f'{self.cookie_name}={cookie}')
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                return response.status, response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.headers.get('Server-Timing', '')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def run_scenario(target, spec, sessions, requests, concurrency, rng_seed):
+    method, make_path, make_data, who = spec
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+
+    def worker(index, count):
+        rng = random.Random(rng_seed + index)
+        for _ in range(count):
+            cookie, token = rng.choice(sessions[who]) if sessions[who] else (None, None)
+            data = make_data(rng) if make_data else None
+            if data is not None:
+                data['csrf_token'] = token
+            started = time.perf_counter()
+            status, server_timing = target.request(method, make_path(rng), data, cookie)
+            elapsed = time.perf_counter() - started
+            match = QUERIES_HEADER.search(server_timing)
+            with lock:
+                latencies.append(elapsed)
+                if match:
+                    queries.append(int(match.group(1)))
+                if status >= 400:
+                    errors.append(status)
+
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(i, count)) for i, count in enumerate(per_thread)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))] * 1000
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'throughput_rps': round(len(latencies) / wall, 1),
+        'p50_ms': round(percentile(50), 2),
+        'p90_ms': round(percentile(90), 2),
+        'p99_ms': round(percentile(99), 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(old_path, results):
+    with open(old_path) as f:
+        old = json.load(f)
+    print(f"\nvs {old['meta']['commit']}:")
+    for name, current in results['scenarios'].items():
+        before = old['scenarios'].get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ('throughput_rps', 'p50_ms', 'p99_ms', 'queries_per_request'):
+            if before.get(key) and current.get(key) is not None:
+                deltas.append(f'{key} {(current[key] - before[key]) / before[key] * 100:+.0f}%')
+        print(f"  {name:<20} {', '.join(deltas)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=200000)
+    parser.add_argument('--likes', type=int, default=100000)
+    parser.add_argument('--notifications', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=300, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--scenario', action='append', help='run only these scenarios')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='SQLite file to seed (default: a temp file)')
+    parser.add_argument('--reuse', action='store_true', help='use --db as already seeded')
+    parser.add_argument('--url', help='benchmark a running server instead of the test client')
+    parser.add_argument('--output', help='JSON results path (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='earlier results JSON to diff against')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(db_path)}'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # The write scenarios reuse a handful of users far faster than any real client
+    os.environ.setdefault('RATELIMIT_ENABLED', '0')
+    # SQL counts are read from Server-Timing, which is off by default
+    os.environ.setdefault('SERVER_TIMING_ENABLED', '1')
+
+    from app import create_app
+    app = create_app()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        if args.reuse:
+            ids = load_ids()
+        else:
+            started = time.perf_counter()
+            ids = seed(args, rng)
+            print(f'Seeded {db_path} in {time.perf_counter() - started:.1f}s')
+
+    visitor_ids = rng.sample(ids['visitor_ids'], min(50, len(ids['visitor_ids'])))
+    sessions = {
+        'anonymous': [],
+        'visitor': [session_cookie(app, user_id) for user_id in visitor_ids],
+        'admin': [session_cookie(app, ids['admin_id'])],
+    }
+    target = (HttpTarget(args.url, app.config['SESSION_COOKIE_NAME']) if args.url
+              else ClientTarget(app))
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'mode': 'http' if args.url else 'test_client',
+            'concurrency': args.concurrency,
+            'requests_per_scenario': args.requests,
+            'dataset': {key: getattr(args, key) for key in ('projects', 'comments', 'likes', 'notifications',
+                                                            'users')} if not args.reuse else 'reused',
+        },
+        'scenarios': {},
+    }
+    for name, spec in scenarios(ids).items():
+        if args.scenario and name not in args.scenario:
+            continue
+        result = run_scenario(target, spec, sessions, args.requests, args.concurrency, args.seed)
+        results['scenarios'][name] = result
+        print(f"{name:<20} {result['throughput_rps']:8.1f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+              f"p99 {result['p99_ms']:7.2f} ms  queries {result['queries_per_request']}  "
+              f"errors {result['errors']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {output}')
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Check that the queries issued by each route are served by an index
+
+Seeds a throwaway SQLite database, drives the routes through the test client
+while recording every SELECT, then runs EXPLAIN QUERY PLAN on each one and
+fails on full table scans. tests/test_query_plans.py runs the same check.
+
+Usage: python benchmarks/query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Tables that are read whole on purpose
+ALLOWED_SCANS = {
+    'counter',  # One row per materialized counter
+}
+
+ROUTES = [
+    ('GET', '/'),
+    ('GET', '/project/1'),
+    ('GET', '/project/1/comments'),
+    ('GET', '/tag/python'),
+    ('GET', '/search?q=flask'),
+    ('GET', '/about'),
+    ('GET', '/api/projects'),
+    ('GET', '/api/projects?sort=popular&limit=5'),
+    ('GET', '/api/projects?status=all&fields=id,titulo,status'),
+    ('GET', '/reset-password/token-de-teste'),
+    ('POST', '/project/1/like'),
+    ('POST', '/project/1/comment'),
+    ('GET', '/admin'),
+    ('GET', '/admin/stats'),
+    ('GET', '/admin/projects'),
+    ('GET', '/admin/achievements'),
+    ('GET', '/admin/notifications'),
+]
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?!.*\b(USING|VIRTUAL TABLE)\b)')
+
+
+def seed():
+    from werkzeug.security import generate_password_hash
+    from extensions import db
+    from models import User, Project, Achievement, Comment, Notification
+    from tags import sync_project_tags
+
+    senha_hash = generate_password_hash('senha123', 'pbkdf2:sha256:1000')
+    admin = User(nome='Admin', email='admin@example.com', senha_hash=senha_hash, is_admin=True)
+    user = User(nome='Visitante', email='user@example.com', senha_hash=senha_hash,
+                reset_token='token-de-teste', reset_token_expires=datetime.utcnow() + timedelta(hours=1))
+    db.session.add_all([admin, user])
+    db.session.flush()
+
+    for i in range(30):
+        project = Project(titulo=f'Projeto Flask {i}', descricao='Aplicação web em Python ' * 5,
+                          tags='Python, Flask', status='published' if i % 3 else 'draft',
+                          likes_count=i, user_id=admin.id)
+        db.session.add(project)
+        db.session.flush()
+        sync_project_tags(project)
+        db.session.add(Comment(conteudo='Muito bom', user_id=user.id, project_id=project.id))
+        db.session.add(Notification(tipo='comment', mensagem='Novo comentário',
+                                    user_id=admin.id))
+        db.session.add(Achievement(titulo=f'Conquista {i}', descricao='Descrição',
+                                   data=datetime.utcnow() - timedelta(days=i), user_id=admin.id))
+    db.session.commit()
+
+    import search
+    search.rebuild_search_index()
+    return admin
+
+
+def record_selects(engine, statements):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.setdefault(statement, parameters)
+
+
+def find_full_scans(database_url):
+    """Drive ROUTES against a fresh database at database_url
+
+    Returns (number of distinct SELECTs, [(statement, scanned tables, plan)]).
+    Raises RuntimeError when a route fails.
+    """
+    os.environ['DATABASE_URL'] = database_url
+
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    client = app.test_client()
+    statements = {}
+    with app.app_context():
+        seed()
+        record_selects(db.engine, statements)
+        # Background job; its queries must stay on indexes too
+        from trending import trending_ranker
+        trending_ranker.refresh(force=True)
+
+    client.post('/login', data={'email': 'admin@example.com', 'senha': 'senha123'})
+    for method, url in ROUTES:
+        data = {'conteudo': 'Comentário de teste'} if method == 'POST' else None
+        response = client.open(url, method=method, data=data)
+        response.close()  # Streamed responses keep their request context until closed
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {url} -> {response.status_code}')
+
+    failures = []
+    with app.app_context(), db.engine.connect() as conn:
+        for statement, parameters in statements.items():
+            plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+            scans = [match.group(1) for match in map(FULL_SCAN.match, plan)
+                     if match and match.group(1) not in ALLOWED_SCANS]
+            if scans:
+                failures.append((statement, scans, plan))
+    return len(statements), failures
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    try:
+        checked, failures = find_full_scans(f"sqlite:///{os.path.join(workdir, 'plans.db')}")
+    except RuntimeError as exc:
+        print(exc)
+        return 1
+
+    for statement, scans, plan in failures:
+        print('FULL SCAN on', ', '.join(scans))
+        print('  ' + ' '.join(statement.split()))
+        print('  ' + '\n  '.join(plan))
+    print(f'{checked} distinct SELECTs checked, {len(failures)} with full table scans')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Benchmark the FTS5 search index against LIKE scans on a generated corpus
+
+Usage: python benchmarks/search_benchmark.py [--projects 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, Project  # noqa: E402
+import search  # noqa: E402
+
+WORDS = ('python flask django api rest web mobile dados machine learning dashboard portfolio '
+         'sqlite postgres docker kubernetes react vue javascript typescript css html design '
+         'automação integração pagamento relatório análise segurança desempenho cache busca').split()
+TAGS = ['Python', 'Flask', 'React', 'SQL', 'Docker', 'API', 'CSS', 'ML', 'Mobile', 'DevOps']
+# Filler vocabulary so the topical words above are selective, as in real text
+FILLER = [f'termo{i}' for i in range(20000)]
+QUERIES = ['flask', 'machine learning', 'automacao', 'dash', 'postgres docker api']
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    return app
+
+
+def seed(count, rng):
+    admin = User(nome='Admin', email='admin@example.com', senha_hash='x', is_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+
+    rows = []
+    for i in range(count):
+        rows.append({
+            'titulo': ' '.join(rng.choices(WORDS, k=1) + rng.choices(FILLER, k=2)).title(),
+            'descricao': ' '.join(rng.choices(WORDS, k=2) + rng.choices(FILLER, k=58)),
+            'tags': ', '.join(rng.sample(TAGS, 3)),
+            'status': 'published',
+            'likes_count': 0,
+            'criado_em': datetime.utcnow(),
+            'atualizado_em': datetime.utcnow(),
+            'user_id': admin.id,
+        })
+        if len(rows) == 5000:
+            db.session.execute(db.insert(Project), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(Project), rows)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            search.ensure_search_index()
+            if not search.fts_enabled():
+                sys.exit('SQLite sem FTS5 neste ambiente.')
+
+            start = time.perf_counter()
+            seed(args.projects, random.Random(args.seed))
+            print(f'seed: {args.projects} projetos em {time.perf_counter() - start:.1f}s')
+
+            start = time.perf_counter()
+            count = search.rebuild_search_index()
+            print(f'rebuild-search-index: {count} documentos em {time.perf_counter() - start:.1f}s')
+
+            print(f'{"consulta":<24}{"resultados":>12}{"fts5 (ms)":>12}{"like (ms)":>12}')
+            for query in QUERIES:
+                _, total = search.search(query)
+                fts_ms = timed(lambda: search.search(query), args.repeat)
+                like_ms = timed(lambda: search._search_like(query, 1, 10), max(1, args.repeat // 10))
+                print(f'{query:<24}{total:>12}{fts_ms:>12.2f}{like_ms:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
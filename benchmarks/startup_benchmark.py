@@ -0,0 +1,68 @@
+"""Measure worker boot: interpreter start to the first response served
+
+Each run is a fresh interpreter that imports the app, builds it with
+create_app() and serves GET / through the test client, like a gunicorn worker
+taking its first request. "initialized" runs against a database stamped by
+init_db; "fresh" gets an empty database each time, so every boot also creates
+the schema (what every worker used to do).
+
+Usage: python benchmarks/startup_benchmark.py [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+response = app.test_client().get('/')
+t3 = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({'import': t1 - t0, 'create_app': t2 - t1, 'first_request': t3 - t2}))
+"""
+
+
+def boot(database_path):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database_path}', LOG_LEVEL='WARNING')
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings['total'] = time.perf_counter() - started
+    return timings
+
+
+def report(label, runs):
+    print(f'{label}:')
+    for key in ('import', 'create_app', 'first_request', 'total'):
+        values = sorted(run[key] * 1000 for run in runs)
+        print(f'  {key:<14} median {statistics.median(values):7.1f} ms   min {values[0]:7.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    stamped = os.path.join(workdir, 'stamped.db')
+    boot(stamped)  # First boot initializes and stamps the schema
+
+    report('initialized', [boot(stamped) for _ in range(args.runs)])
+    report('fresh', [boot(os.path.join(workdir, f'fresh{i}.db')) for i in range(args.runs)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCache:
+    """Bounded in-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries=256, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Shared cache backend so every worker sees the same entries and invalidations"""
+
+    def __init__(self, url, default_ttl=300, prefix='portfolio:'):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError('CACHE_BACKEND=redis requer o pacote "redis" instalado.') from exc
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class Cache:
+    """Flask extension wrapper that picks the cache backend from the app config
+
+    Every instance shares CACHE_BACKEND and CACHE_REDIS_URL; ``name`` picks the
+    config keys for its own in-memory size and TTL, so separate instances do not
+    evict each other's entries.
+    """
+
+    def __init__(self, app=None, name='CACHE', max_entries=256):
+        self.name = name
+        self.max_entries = max_entries
+        self.backend = MemoryCache(max_entries=max_entries)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_BACKEND', os.environ.get('CACHE_BACKEND', 'memory'))
+        app.config.setdefault('CACHE_REDIS_URL', os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+        max_entries_key, ttl_key = f'{self.name}_MAX_ENTRIES', f'{self.name}_DEFAULT_TTL'
+        app.config.setdefault(max_entries_key, int(os.environ.get(max_entries_key, self.max_entries)))
+        app.config.setdefault(ttl_key, int(os.environ.get(ttl_key, 300)))
+
+        if app.config['CACHE_BACKEND'] == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'],
+                                      default_ttl=app.config[ttl_key])
+        else:
+            self.backend = MemoryCache(max_entries=app.config[max_entries_key],
+                                       default_ttl=app.config[ttl_key])
+        app.extensions[self.name.lower()] = self
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
@@ -0,0 +1,199 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('backfill-tags')
+@with_appcontext
+def backfill_tags_command():
+    """Populate the tag tables from Project.tags"""
+    from tags import backfill_tags
+    backfill_tags()
+    click.echo('Tags preenchidas a partir dos projetos existentes.')
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Rebuild the full-text search index from scratch"""
+    from search import rebuild_search_index
+    count = rebuild_search_index()
+    click.echo(f'Índice de busca reconstruído com {count} documentos.')
+
+
+@click.command('reconcile-likes')
+@with_appcontext
+def reconcile_likes_command():
+    """Recompute Project.likes_count from the Like table"""
+    from likes import reconcile_like_counts
+    fixed = reconcile_like_counts()
+    click.echo(f'{fixed} projeto(s) com contagem de curtidas corrigida.')
+
+
+@click.command('compact-notifications')
+@click.option('--days', type=int, default=None, help='Idade mínima em dias (padrão: NOTIFICATION_RETENTION_DAYS).')
+@with_appcontext
+def compact_notifications_command(days):
+    """Archive read notifications older than the retention period"""
+    from flask import current_app
+    from notifications import compact_notifications
+    days = days if days is not None else current_app.config['NOTIFICATION_RETENTION_DAYS']
+    removed = compact_notifications(days)
+    click.echo(f'{removed} notificação(ões) antigas compactadas no arquivo.')
+
+
+@click.command('recount')
+@with_appcontext
+def recount_command():
+    """Correct drift in the dashboard counters (safe to run from cron)"""
+    from counters import recount
+    drift = recount()
+    if drift:
+        for nome, delta in drift.items():
+            click.echo(f'{nome}: corrigido em {delta:+d}')
+    else:
+        click.echo('Contadores em dia.')
+
+
+@click.command('refresh-trending')
+@with_appcontext
+def refresh_trending_command():
+    """Recompute the trending ranking now"""
+    from trending import trending_ranker
+    ranked = trending_ranker.refresh(force=True)
+    click.echo(f'Ranking de projetos em alta recalculado com {ranked} projeto(s).')
+
+
+@click.command('send-mail')
+@with_appcontext
+def send_mail_command():
+    """Send every due email in the outbox now"""
+    from mail import mail_outbox
+    sent, failed = mail_outbox.send_pending()
+    click.echo(f'{sent} email(s) enviado(s), {failed} com falha.')
+
+
+@click.command('mail-sink')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', type=int, default=1025, show_default=True)
+def mail_sink_command(host, port):
+    """Run a local SMTP server that prints the emails it receives"""
+    from mail import DebugSMTPServer
+    server = DebugSMTPServer((host, port), output=click.echo)
+    click.echo(f'Servidor SMTP de teste em {host}:{port} (MAIL_SERVER={host} MAIL_PORT={port} MAIL_USE_TLS=0).')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@click.command('generate-image-variants')
+@click.option('--all', 'regenerate', is_flag=True, help='Regenera também imagens que já têm variantes.')
+@with_appcontext
+def generate_image_variants_command(regenerate):
+    """Create thumbnails and WebP variants for existing uploads"""
+    from images import backfill_variants
+    stored = backfill_variants(only_missing=not regenerate)
+    click.echo(f'Variantes geradas para {stored} imagem(ns).')
+
+
+@click.command('gc-uploads')
+@click.option('--dry-run', is_flag=True, help='Apenas lista os arquivos que seriam removidos.')
+@click.option('--grace', type=int, default=3600, help='Ignora arquivos mais novos que N segundos.')
+@with_appcontext
+def gc_uploads_command(dry_run, grace):
+    """Delete uploaded files no longer referenced by any project or achievement"""
+    from images import referenced_image_urls
+    from storage import upload_store
+    deleted = upload_store.collect_garbage(referenced_image_urls(), grace_seconds=grace, dry_run=dry_run)
+    for key in deleted:
+        click.echo(key)
+    verb = 'seriam removidos' if dry_run else 'removidos'
+    click.echo(f'{len(deleted)} arquivo(s) {verb}.')
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress static css/js into static/dist"""
+    from flask import current_app
+    from assets import assets, build_assets
+    manifest = build_assets(current_app.static_folder)
+    assets.load_manifest()
+    for logical, built in sorted(manifest.items()):
+        click.echo(f'{logical} -> {built}')
+
+
+@click.command('export-data')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, allow_dash=True), default='-',
+              help='Arquivo de saída (padrão: stdout).')
+@click.option('--with-uploads', is_flag=True, help='Gera um tar com os dados e as imagens enviadas.')
+@click.option('--with-password-hashes', is_flag=True,
+              help='Inclui os hashes de senha; sem eles, usuários importados precisam redefinir a senha.')
+@with_appcontext
+def export_data_command(output, with_uploads, with_password_hashes):
+    """Stream users, projects, achievements, comments and likes as NDJSON (or a tar)"""
+    from backup import iter_archive, iter_ndjson
+    chunks = (iter_archive(with_password_hashes=with_password_hashes) if with_uploads
+              else iter_ndjson(with_password_hashes=with_password_hashes))
+    with click.open_file(output, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    if output != '-':
+        click.echo(f'Dados exportados para {output}.')
+
+
+@click.command('import-data')
+@click.argument('source', type=click.File('rb'))
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Linhas por INSERT em lote.')
+@with_appcontext
+def import_data_command(source, batch_size):
+    """Load a file written by export-data, giving the rows new ids"""
+    from backup import import_stream, InvalidExport
+    try:
+        stats = import_stream(source, batch_size)
+    except InvalidExport as exc:
+        raise click.ClickException(str(exc))
+    for nome, total in sorted(stats.items()):
+        click.echo(f'{nome}: {total}')
+    click.echo('Importação concluída.')
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create tables, apply migrations and seed derived data"""
+    from schema import init_db, current_version
+    init_db()
+    click.echo(f'Banco de dados inicializado (versão do esquema {current_version()}).')
+
+
+@click.command('migrate')
+@with_appcontext
+def migrate_command():
+    """Apply pending schema migrations"""
+    from schema import migrate, current_version
+    applied = migrate()
+    if applied:
+        click.echo(f'Migrações aplicadas: {", ".join(map(str, applied))}.')
+    click.echo(f'Versão do esquema: {current_version()}.')
+
+
+def register_commands(app):
+    """Attach the maintenance commands to the flask CLI"""
+    app.cli.add_command(backfill_tags_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(reconcile_likes_command)
+    app.cli.add_command(compact_notifications_command)
+    app.cli.add_command(recount_command)
+    app.cli.add_command(refresh_trending_command)
+    app.cli.add_command(send_mail_command)
+    app.cli.add_command(mail_sink_command)
+    app.cli.add_command(generate_image_variants_command)
+    app.cli.add_command(gc_uploads_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(export_data_command)
+    app.cli.add_command(import_data_command)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_command)
@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+import time
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from database import dialect_insert
+from models import Counter, Project, Comment, Like, Notification
+
+logger = logging.getLogger(__name__)
+
+# Counter name -> query that computes its exact value
+SOURCES = {
+    'projects': lambda: select(func.count(Project.id)),
+    'comments': lambda: select(func.count(Comment.id)),
+    'likes': lambda: select(func.count(Like.id)),
+    'unread_notifications': lambda: select(func.count(Notification.id)).where(Notification.lida.is_(False)),
+}
+
+
+def bump(nome, delta):
+    """Add delta to a counter inside the caller's transaction"""
+    if not delta:
+        return
+    stmt = dialect_insert(Counter).values(nome=nome, valor=delta)
+    stmt = stmt.on_conflict_do_update(index_elements=[Counter.nome],
+                                      set_={'valor': Counter.valor + delta})
+    db.session.execute(stmt)
+
+
+def get_counter(nome):
+    """Current value of one counter (0 when missing)"""
+    return db.session.execute(select(Counter.valor).where(Counter.nome == nome)).scalar() or 0
+
+
+def get_counters():
+    """All counters as a dict, with missing ones reported as 0"""
+    values = dict(db.session.execute(select(Counter.nome, Counter.valor)).all())
+    return {nome: values.get(nome, 0) for nome in SOURCES}
+
+
+def recount():
+    """Recompute every counter from its table; returns {nome: drift} for the ones that were off"""
+    stored = dict(db.session.execute(select(Counter.nome, Counter.valor)).all())
+    drift = {}
+    for nome, source in SOURCES.items():
+        actual = db.session.execute(source()).scalar()
+        if stored.get(nome) != actual:
+            drift[nome] = actual - stored.get(nome, 0)
+            db.session.merge(Counter(nome=nome, valor=actual))
+    db.session.commit()
+    return drift
+
+
+def ensure_counters():
+    """Seed the counters the first time the table is empty"""
+    if db.session.execute(select(func.count()).select_from(Counter)).scalar() < len(SOURCES):
+        recount()
+
+
+class CounterReconciler:
+    """Runs recount() from a background thread every COUNTERS_RECOUNT_INTERVAL seconds
+
+    The counters are bumped in the same transaction as the rows they count, so
+    drift only comes from writes made outside the app (manual SQL, restores);
+    an occasional recount puts it right without anyone running the CLI.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        # 0 disables the thread (use "flask recount" from cron instead)
+        app.config.setdefault('COUNTERS_RECOUNT_INTERVAL', int(os.environ.get('COUNTERS_RECOUNT_INTERVAL', 3600)))
+        self.app = app
+        self.interval = app.config['COUNTERS_RECOUNT_INTERVAL']
+        if self.interval:
+            # Started from the first request so it runs in the forked worker
+            app.before_request(self._ensure_worker)
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='counter-reconciler', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            # init_db has just seeded the counters, so the first pass waits a full interval
+            time.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    drift = recount()
+                    if drift:
+                        logger.warning('Contadores corrigidos: %s', drift)
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    logger.exception('Falha ao recalcular os contadores')
+                finally:
+                    db.session.remove()
+
+
+counter_reconciler = CounterReconciler()
@@ -0,0 +1,104 @@
+import importlib
+import os
+from functools import partial
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from extensions import db, READONLY_BIND
+
+
+def database_url():
+    """DATABASE_URL if set, else the local SQLite file"""
+    url = os.environ.get('DATABASE_URL', 'sqlite:///portfolio.db')
+    # Hosting providers still hand out the postgres:// scheme SQLAlchemy dropped
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def dialect_insert(table):
+    """INSERT supporting ON CONFLICT for the active backend; only that dialect gets imported"""
+    name = 'postgresql' if db.engine.dialect.name == 'postgresql' else 'sqlite'
+    return importlib.import_module(f'sqlalchemy.dialects.{name}').insert(table)
+
+
+def engine_options(url, config):
+    """Pool settings that suit the backend behind url"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite':
+        if parsed.database in (None, '', ':memory:'):
+            return {}
+        # Connections are local files: no liveness checks or recycling needed, and
+        # pysqlite's timeout is the busy handler that waits out other writers
+        return {
+            'pool_size': config['DATABASE_POOL_SIZE'],
+            'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000},
+        }
+    return {
+        'pool_size': config['DATABASE_POOL_SIZE'],
+        'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+        'pool_timeout': 10,
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+    }
+
+
+def _sqlite_pragmas(config, readonly, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a worker writes; NORMAL only syncs at checkpoints
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}")
+    cursor.execute(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}")
+    if readonly:
+        cursor.execute('PRAGMA query_only=ON')
+    cursor.close()
+
+
+def _postgres_readonly(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY')
+    cursor.close()
+    dbapi_connection.commit()
+
+
+def _route_reads():
+    g.db_readonly = request.method in ('GET', 'HEAD')
+
+
+def init_database(app):
+    """Configure the engines from the environment and initialize db"""
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_url())
+    app.config.setdefault('DATABASE_POOL_SIZE', int(os.environ.get('DATABASE_POOL_SIZE', 5)))
+    app.config.setdefault('DATABASE_MAX_OVERFLOW', int(os.environ.get('DATABASE_MAX_OVERFLOW', 10)))
+    app.config.setdefault('DATABASE_READONLY_GETS',
+                          os.environ.get('DATABASE_READONLY_GETS', '').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT', 5000)  # ms
+    app.config.setdefault('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    app.config.setdefault('SQLITE_CACHE_SIZE_KB', 64 * 1024)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    options = engine_options(url, app.config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', options)
+    if app.config['DATABASE_READONLY_GETS']:
+        # Same database, separate pool of connections that refuse writes
+        readonly_url = os.environ.get('DATABASE_READONLY_URL', url)
+        app.config.setdefault('SQLALCHEMY_BINDS', {})
+        app.config['SQLALCHEMY_BINDS'][READONLY_BIND] = {'url': readonly_url,
+                                                         **engine_options(readonly_url, app.config)}
+
+    db.init_app(app)
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            readonly = bind_key == READONLY_BIND
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', partial(_sqlite_pragmas, app.config, readonly))
+            elif readonly and engine.dialect.name == 'postgresql':
+                event.listen(engine, 'connect', _postgres_readonly)
+
+    if app.config['DATABASE_READONLY_GETS']:
+        app.before_request(_route_reads)
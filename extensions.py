@@ -1,8 +1,37 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.sql import Delete, Insert, Update
+from cache import Cache
+
+# Bind used for reads while serving GET requests (see database.py)
+READONLY_BIND = 'readonly'
 
 class Base(DeclarativeBase):
     pass
 
+class RoutingSession(Session):
+    """Sends reads made while serving GET requests to the read-only bind
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary bind,
+    so a GET that writes still works; it just cannot read its own uncommitted
+    writes back through the read-only connection.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing
+                and not isinstance(clause, (Insert, Update, Delete))
+                and has_app_context() and g.get('db_readonly')):
+            return self._db.engines[READONLY_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 # Initialize SQLAlchemy without app
-db = SQLAlchemy(model_class=Base)
\ No newline at end of file
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
+
+# Cache for hot public pages (backend is chosen in init_app)
+cache = Cache()
+
+# Logged-in user snapshots (auth.py); one per active session, so kept apart from
+# the page cache where a few hundred sessions would push out the home page
+user_cache = Cache(name='USER_CACHE', max_entries=4096)
\ No newline at end of file
@@ -0,0 +1,65 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, request, session
+
+
+def make_etag(*parts):
+    """Stable validator from whatever identifies the page's content
+
+    The build id (asset manifest and templates, see assets.py) is always
+    mixed in, so a deploy that changes the HTML or the fingerprinted asset
+    URLs invalidates every copy clients hold.
+    """
+    return hashlib.sha1(repr((current_app.config['BUILD_ID'],) + parts).encode()).hexdigest()
+
+
+def is_public_request():
+    """Anonymous GETs render the same page for everyone, so they can be shared and revalidated
+
+    A pending flash message is rendered into the page for this visitor
+    only, so that response is not public either.
+    """
+    return request.method in ('GET', 'HEAD') and 'user_id' not in session and not session.get('_flashes')
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value else None
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response when the client's copy is still current, else None
+
+    Call this before rendering so a revalidation skips the template entirely.
+    """
+    if not is_public_request():
+        return None
+
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        matched = _as_utc(last_modified) <= request.if_modified_since
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    response = current_app.response_class(status=304)
+    return add_cache_headers(response, etag, last_modified)
+
+
+def add_cache_headers(response, etag, last_modified=None):
+    """Attach validators and Cache-Control; only anonymous responses are shareable"""
+    response.vary.add('Cookie')
+    if not is_public_request():
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.public = True
+    response.cache_control.max_age = 0
+    response.cache_control.s_maxage = current_app.config['PUBLIC_CACHE_MAX_AGE']
+    response.cache_control.must_revalidate = True
+    return response
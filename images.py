@@ -0,0 +1,209 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from flask import url_for
+from extensions import db
+from models import Project, Achievement
+from storage import upload_store
+
+logger = logging.getLogger(__name__)
+
+# Widths generated for every upload; the smallest also gets a JPEG fallback
+VARIANT_WIDTHS = (400, 800, 1200)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+MODELS = {'project': Project, 'achievement': Achievement}
+
+
+# Image.info keys that carry camera, location or editing metadata
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment', 'photoshop')
+
+
+def _has_metadata(image):
+    return (bool(image.getexif()) or any(key in image.info for key in METADATA_KEYS)
+            or bool(getattr(image, 'text', None)))
+
+
+def _store_image(store, image, ext, **options):
+    """Encode image to a temp file and move it into the content-addressed store"""
+    os.makedirs(store.backend.tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=store.backend.tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            image.save(tmp, **options)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return store.save_temp(tmp_path, ext)
+
+
+def process_image(store, imagem_url):
+    """Strip metadata from an upload and store its resized WebP/JPEG variants
+
+    Runs in a worker process. Stored files are never rewritten: when the
+    upload carries metadata, the cleaned copy is stored under its own hash.
+    Returns (imagem_url, variants) where imagem_url is the copy to show (the
+    upload itself when it was already clean) and variants is
+    {'webp': {width: path}, 'thumb': path}, paths relative to the static folder.
+    """
+    from PIL import Image, ImageOps
+
+    ext = os.path.splitext(imagem_url)[1].lower()
+    with store.backend.open(store.key_for(imagem_url)) as source, Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+        source_format = original.format
+        dirty = _has_metadata(original)
+
+    if dirty:
+        # Pillow drops EXIF and text chunks unless they are passed back explicitly;
+        # the clean copy has none, so it is not re-encoded on a later run
+        imagem_url = _store_image(store, image, ext, format=source_format,
+                                  **({'quality': 95} if source_format == 'JPEG' else {}))
+
+    rgb = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    variants = {'webp': {}}
+    for width in VARIANT_WIDTHS:
+        if width >= rgb.width and variants['webp']:
+            break
+        resized = rgb.copy()
+        resized.thumbnail((width, width * 10), Image.LANCZOS)
+        variants['webp'][resized.width] = _store_image(store, resized, '.webp', format='WEBP',
+                                                       quality=WEBP_QUALITY, method=4)
+
+        if 'thumb' not in variants:
+            variants['thumb'] = _store_image(store, resized.convert('RGB'), '.jpg', format='JPEG',
+                                             quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return imagem_url, variants
+
+
+def srcset(variants):
+    """Jinja filter: build a srcset attribute value from stored variants"""
+    if not variants or not variants.get('webp'):
+        return ''
+    return ', '.join(f"{url_for('static', filename=path)} {width}w"
+                     for width, path in sorted(variants['webp'].items(), key=lambda item: int(item[0])))
+
+
+class ImagePipeline:
+    """Generates image variants in a process pool, off the request thread"""
+
+    def __init__(self):
+        self.app = None
+        self._executor = None
+        self._storer = None
+        self._lock = threading.Lock()
+        self._ready_listeners = []
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_WORKERS', 2)
+        self.app = app
+        app.add_template_filter(srcset, 'srcset')
+
+    def on_ready(self, listener):
+        """Register listener(kind, obj_id) to run once variants are stored"""
+        self._ready_listeners.append(listener)
+        return listener
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Workers come from a clean forkserver process: forking the threaded
+                # web worker could copy a lock some other thread was holding
+                self._executor = ProcessPoolExecutor(max_workers=self.app.config['IMAGE_WORKERS'],
+                                                     mp_context=multiprocessing.get_context('forkserver'))
+                # Results are written to the database from one thread of ours rather
+                # than from the process pool's internal result thread
+                self._storer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-store')
+            return self._executor
+
+    def schedule(self, kind, obj_id, imagem_url):
+        """Queue variant generation for a freshly saved upload"""
+        if not imagem_url:
+            return None
+        future = self.executor.submit(process_image, upload_store, imagem_url)
+        future.add_done_callback(lambda f: self._storer.submit(self._store, kind, obj_id, imagem_url, f))
+        return future
+
+    def _store(self, kind, obj_id, imagem_url, future):
+        try:
+            clean_url, variants = future.result()
+        except Exception:
+            logger.exception('Falha ao gerar variantes de %s', imagem_url)
+            return
+        with self.app.app_context():
+            try:
+                stored = store_variants(kind, obj_id, imagem_url, clean_url, variants)
+                db.session.commit()
+                if stored:
+                    for listener in self._ready_listeners:
+                        listener(kind, obj_id)
+            except Exception:
+                db.session.rollback()
+                logger.exception('Falha ao gravar variantes de %s', imagem_url)
+            finally:
+                db.session.remove()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._storer.shutdown(wait=True)
+            self._executor = None
+            self._storer = None
+
+
+def store_variants(kind, obj_id, imagem_url, clean_url, variants):
+    """Point the row at the clean image and its variants unless the image was replaced meanwhile
+
+    The original upload is left for collect-garbage once nothing references
+    it. Returns whether a row changed.
+    """
+    model = MODELS[kind]
+    stmt = (db.update(model)
+            .where(model.id == obj_id, model.imagem_url == imagem_url)
+            .values(imagem_url=clean_url, imagem_variants=variants))
+    return db.session.execute(stmt).rowcount > 0
+
+
+def referenced_image_urls():
+    """Every upload path still referenced by a row, originals and variants"""
+    urls = set()
+    for model in MODELS.values():
+        for imagem_url, variants in db.session.query(model.imagem_url, model.imagem_variants).filter(
+                model.imagem_url.isnot(None)):
+            urls.add(imagem_url)
+            if variants:
+                urls.update(variants.get('webp', {}).values())
+                if variants.get('thumb'):
+                    urls.add(variants['thumb'])
+    return urls
+
+
+def backfill_variants(only_missing=True):
+    """Generate variants for existing uploads in the process pool; returns how many were stored"""
+    jobs = []
+    for kind, model in MODELS.items():
+        query = db.session.query(model.id, model.imagem_url).filter(model.imagem_url.isnot(None))
+        if only_missing:
+            query = query.filter(model.imagem_variants.is_(None))
+        jobs.extend((kind, obj_id, imagem_url) for obj_id, imagem_url in query)
+
+    stored = 0
+    futures = [(job, image_pipeline.executor.submit(process_image, upload_store, job[2])) for job in jobs]
+    for (kind, obj_id, imagem_url), future in futures:
+        try:
+            clean_url, variants = future.result()
+        except Exception:
+            logger.exception('Falha ao gerar variantes de %s', imagem_url)
+            continue
+        stored += store_variants(kind, obj_id, imagem_url, clean_url, variants)
+    db.session.commit()
+    return stored
+
+
+image_pipeline = ImagePipeline()
@@ -0,0 +1,226 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import case, exists, func, literal, select
+from extensions import db
+from database import dialect_insert
+from models import Project, Like
+import counters
+
+logger = logging.getLogger(__name__)
+
+
+def _insert_like_ignore(user_id, project_id):
+    """INSERT ... ON CONFLICT DO NOTHING on the (user_id, project_id) unique constraint
+
+    Inserted through SELECT ... WHERE EXISTS, so a like for a project deleted
+    meanwhile is skipped rather than failing (or, without foreign key checks
+    on SQLite, left as an orphan).
+    """
+    row = select(literal(user_id), literal(project_id), literal(datetime.utcnow())).where(
+        exists().where(Project.id == project_id))
+    stmt = (dialect_insert(Like)
+            .from_select(['user_id', 'project_id', 'criado_em'], row)
+            .on_conflict_do_nothing())
+    return db.session.execute(stmt).rowcount
+
+
+def _delete_like(user_id, project_id):
+    stmt = db.delete(Like).where(Like.user_id == user_id, Like.project_id == project_id)
+    return db.session.execute(stmt).rowcount
+
+
+def _bump_likes_count(project_id, delta):
+    """Adjust likes_count in SQL so concurrent writers never lose updates"""
+    new_count = func.coalesce(Project.likes_count, 0) + delta
+    stmt = (db.update(Project)
+            .where(Project.id == project_id)
+            .values(likes_count=case((new_count < 0, 0), else_=new_count))
+            .returning(Project.likes_count))
+    return db.session.execute(stmt).scalar()
+
+
+def apply_toggle(user_id, project_id):
+    """Toggle a like with one conditional delete/insert plus a counter update
+
+    Runs in the caller's transaction; returns (liked, likes_count, changed).
+    """
+    if _delete_like(user_id, project_id):
+        counters.bump('likes', -1)
+        return False, _bump_likes_count(project_id, -1), True
+    if _insert_like_ignore(user_id, project_id):
+        counters.bump('likes', 1)
+        return True, _bump_likes_count(project_id, 1), True
+    # Lost a race with a concurrent like from the same user: it is already liked
+    return True, db.session.scalar(select(Project.likes_count).where(Project.id == project_id)), False
+
+
+class LikeBuffer:
+    """Coalesces like toggles in memory and writes them to the database in batches
+
+    Only the final state per (user, project) is kept, so like/unlike bursts from
+    the same user collapse to at most one write at flush time.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self._pending = {}  # (user_id, project_id) -> desired liked state
+        self._flushing = {}  # Taken by a flush that has not committed yet
+        self._flushes = 0  # Bumped whenever _flushing is emptied
+        self._deltas = defaultdict(int)  # project_id -> pending likes_count change
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._flush_listeners = []
+
+    def init_app(self, app):
+        app.config.setdefault('LIKE_BUFFER_ENABLED', False)
+        app.config.setdefault('LIKE_BUFFER_INTERVAL', 2.0)
+        app.config.setdefault('LIKE_BUFFER_MAX_PENDING', 1000)
+        self.app = app
+        self.enabled = app.config['LIKE_BUFFER_ENABLED']
+        self.interval = app.config['LIKE_BUFFER_INTERVAL']
+        self.max_pending = app.config['LIKE_BUFFER_MAX_PENDING']
+        if self.enabled:
+            atexit.register(self.flush)
+
+    def on_flush(self, listener):
+        """Register listener(project_ids) to run after each flush that changed counts"""
+        self._flush_listeners.append(listener)
+        return listener
+
+    def pending_state(self, user_id, project_id):
+        """The buffered liked state for a user, or None if nothing is pending"""
+        key = (user_id, project_id)
+        with self._lock:
+            return self._pending.get(key, self._flushing.get(key))
+
+    def toggle(self, user_id, project_id, stored_count):
+        """Record a toggle; returns (liked, estimated likes_count) without writing
+
+        The stored state is read before taking the lock, so like requests do
+        not queue behind each other's queries, and the flip happens under it,
+        so two toggles from the same user cannot both start from the same
+        state. A flush clears _flushing only after its commit; if one finished
+        between the read and the flip, the read may be stale and is redone.
+        """
+        key = (user_id, project_id)
+        while True:
+            with self._lock:
+                current = self._pending.get(key, self._flushing.get(key))
+                flushes = self._flushes
+            if current is None:
+                current = db.session.scalar(
+                    select(Like.id).where(Like.user_id == user_id, Like.project_id == project_id)
+                ) is not None
+
+            with self._lock:
+                buffered = self._pending.get(key, self._flushing.get(key))
+                if buffered is None and self._flushes != flushes:
+                    continue
+                liked = not (current if buffered is None else buffered)
+                self._pending[key] = liked
+                self._deltas[project_id] += 1 if liked else -1
+                estimated = max((stored_count or 0) + self._deltas[project_id], 0)
+                size = len(self._pending)
+            break
+        self._ensure_worker()
+        if size >= self.max_pending:
+            self._wakeup.set()
+        return liked, estimated
+
+    def flush(self):
+        """Write every pending toggle in one transaction
+
+        When the write fails the batch goes back into the buffer, behind any
+        newer toggle of the same key, and is retried on the next flush.
+        Returns whether the batch was written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            deltas_taken, self._deltas = self._deltas, defaultdict(int)
+            self._flushing = pending
+        if not pending:
+            return True
+
+        with self.app.app_context():
+            deltas = defaultdict(int)
+            try:
+                for (user_id, project_id), liked in pending.items():
+                    if liked:
+                        deltas[project_id] += _insert_like_ignore(user_id, project_id)
+                    else:
+                        deltas[project_id] -= _delete_like(user_id, project_id)
+                for project_id, delta in deltas.items():
+                    if delta:
+                        _bump_likes_count(project_id, delta)
+                counters.bump('likes', sum(deltas.values()))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Falha ao gravar %d curtidas em lote; nova tentativa no próximo ciclo',
+                                 len(pending))
+                with self._lock:
+                    for key, liked in pending.items():
+                        self._pending.setdefault(key, liked)
+                    for project_id, delta in deltas_taken.items():
+                        self._deltas[project_id] += delta
+                    self._flushing = {}
+                    self._flushes += 1
+                return False
+            finally:
+                db.session.remove()
+
+            with self._lock:
+                self._flushing = {}
+                self._flushes += 1
+
+            changed = [project_id for project_id, delta in deltas.items() if delta]
+            if changed:
+                for listener in self._flush_listeners:
+                    listener(changed)
+        return True
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='like-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+like_buffer = LikeBuffer()
+
+
+def toggle_like(user_id, project_id, stored_count):
+    """Toggle a like, buffered or immediate depending on LIKE_BUFFER_ENABLED
+
+    Returns (liked, likes_count, applied, changed); applied is False when the
+    write is still pending in the buffer, changed is False when a concurrent
+    request had already made the same change.
+    """
+    if like_buffer.enabled:
+        liked, likes_count = like_buffer.toggle(user_id, project_id, stored_count)
+        return liked, likes_count, False, True
+    liked, likes_count, changed = apply_toggle(user_id, project_id)
+    return liked, likes_count, True, changed
+
+
+def reconcile_like_counts():
+    """Recompute likes_count from the Like table, returning how many projects drifted"""
+    actual = (select(func.count(Like.id)).where(Like.project_id == Project.id)
+              .correlate(Project).scalar_subquery())
+    stmt = (db.update(Project)
+            .where(func.coalesce(Project.likes_count, -1) != actual)
+            .values(likes_count=actual)
+            .execution_options(synchronize_session=False))
+    fixed = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return fixed
@@ -0,0 +1,345 @@
+import atexit
+import logging
+import os
+import secrets
+import smtplib
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from sqlalchemy import event, select
+from extensions import db
+from models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentMailError(Exception):
+    """The server refused the message for good; retrying will not help"""
+
+
+class SMTPConnection:
+    """One SMTP session reused across messages and reopened when the server drops it"""
+
+    def __init__(self, config):
+        self.config = config
+        self._smtp = None
+        self._last_used = 0.0
+
+    def send(self, message):
+        if self._smtp is not None and time.monotonic() - self._last_used > self.config['MAIL_IDLE_TIMEOUT']:
+            self.close()  # The server has likely timed the session out already
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPRecipientsRefused as exc:
+            raise PermanentMailError(str(exc.recipients)) from exc
+        except smtplib.SMTPResponseException as exc:
+            if exc.smtp_code >= 500:
+                raise PermanentMailError(f'{exc.smtp_code} {exc.smtp_error!r}') from exc
+            self.close()
+            raise
+        except (smtplib.SMTPException, OSError):
+            self.close()
+            raise
+        self._last_used = time.monotonic()
+
+    def _connect(self):
+        config = self.config
+        smtp = smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=config['MAIL_TIMEOUT'])
+        if config['MAIL_USE_TLS']:
+            smtp.starttls()
+        if config['MAIL_USERNAME']:
+            smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        return smtp
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class ConsoleConnection:
+    """Prints messages instead of sending them (MAIL_SERVER unset)"""
+
+    def send(self, message):
+        print('=' * 60)
+        print(f"Para: {message['To']}")
+        print(f"Assunto: {message['Subject']}")
+        print()
+        print(message.get_content().rstrip())
+        print('=' * 60)
+
+    def close(self):
+        pass
+
+
+class MailOutbox:
+    """Durable email queue: requests insert rows, a background thread sends them
+
+    Rows are claimed by pushing proxima_tentativa forward, so several workers
+    can drain the same table and a sender that dies only delays its batch.
+    Failed sends back off exponentially up to MAIL_MAX_ATTEMPTS.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._connection = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._send_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('MAIL_SERVER', os.environ.get('MAIL_SERVER'))
+        app.config.setdefault('MAIL_PORT', int(os.environ.get('MAIL_PORT', 587)))
+        app.config.setdefault('MAIL_USE_TLS', os.environ.get('MAIL_USE_TLS', '1').lower() in ('1', 'true', 'yes'))
+        app.config.setdefault('MAIL_USERNAME', os.environ.get('MAIL_USERNAME'))
+        app.config.setdefault('MAIL_PASSWORD', os.environ.get('MAIL_PASSWORD'))
+        app.config.setdefault('MAIL_DEFAULT_SENDER', os.environ.get('MAIL_DEFAULT_SENDER', 'no-reply@localhost'))
+        app.config.setdefault('MAIL_TIMEOUT', 10)
+        app.config.setdefault('MAIL_IDLE_TIMEOUT', 60)  # seconds an unused SMTP session is kept
+        app.config.setdefault('MAIL_BATCH_SIZE', 50)
+        app.config.setdefault('MAIL_POLL_INTERVAL', 5.0)
+        app.config.setdefault('MAIL_MAX_ATTEMPTS', 6)
+        app.config.setdefault('MAIL_RETRY_DELAY', 30)  # seconds, doubled after each failure
+        app.config.setdefault('MAIL_MAX_RETRY_DELAY', 3600)
+        app.config.setdefault('MAIL_CLAIM_TIMEOUT', 300)
+        # Sent and failed rows are deleted this many days after their last attempt (0 keeps them)
+        app.config.setdefault('MAIL_RETENTION_DAYS', int(os.environ.get('MAIL_RETENTION_DAYS', 30)))
+        app.config.setdefault('MAIL_PURGE_INTERVAL', 3600)  # seconds between purges by the sender thread
+        self.app = app
+        # Started from a request so it runs in the forked worker; it also picks
+        # up rows left by a previous process
+        app.before_request(self._ensure_worker)
+        event.listen(db.session, 'after_commit', self._after_commit)
+        atexit.register(self.shutdown)
+
+    def enqueue(self, destinatario, assunto, corpo):
+        """Add an email to the outbox in the caller's transaction; it is sent after the commit"""
+        db.session.add(OutgoingEmail(destinatario=destinatario, assunto=assunto, corpo=corpo))
+        db.session.info['mail_enqueued'] = True
+
+    def _after_commit(self, session):
+        # Wake the sender as soon as the new rows are visible to it
+        if session.info.pop('mail_enqueued', False):
+            self._wakeup.set()
+
+    def send_pending(self):
+        """Send every due email, batch by batch; returns (sent, failed). Needs an app context."""
+        sent = failed = 0
+        with self._send_lock:
+            try:
+                while True:
+                    batch = self._claim()
+                    if not batch:
+                        break
+                    for email in batch:
+                        if self._deliver(email):
+                            sent += 1
+                        else:
+                            failed += 1
+                    db.session.commit()
+            finally:
+                # Keep the SMTP session for the next batch only while the thread loops
+                if self._stopping.is_set() or self._thread is not threading.current_thread():
+                    self._close_connection()
+        return sent, failed
+
+    def purge(self):
+        """Delete sent and failed emails older than MAIL_RETENTION_DAYS; returns how many. Needs an app context."""
+        days = self.app.config['MAIL_RETENTION_DAYS']
+        if not days:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        # proxima_tentativa was last pushed when the row was claimed for its final attempt,
+        # and (status, proxima_tentativa) is indexed for the sender's own poll
+        result = db.session.execute(
+            db.delete(OutgoingEmail)
+            .where(OutgoingEmail.status.in_(('sent', 'failed')), OutgoingEmail.proxima_tentativa < cutoff)
+            .execution_options(synchronize_session=False))
+        db.session.commit()
+        return result.rowcount
+
+    def shutdown(self):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=self.app.config['MAIL_TIMEOUT'] + 5)
+
+    def _claim(self):
+        """Reserve up to MAIL_BATCH_SIZE due emails for this pass"""
+        config = self.app.config
+        now = datetime.utcnow()
+        token = secrets.token_hex(8)
+        due = select(OutgoingEmail.id).where(
+            OutgoingEmail.status == 'pending', OutgoingEmail.proxima_tentativa <= now,
+        ).order_by(OutgoingEmail.proxima_tentativa).limit(config['MAIL_BATCH_SIZE'])
+        ids = list(db.session.scalars(due))
+        if not ids:
+            return []
+        # Rows another worker claimed in the meantime no longer match
+        db.session.execute(
+            db.update(OutgoingEmail)
+            .where(OutgoingEmail.id.in_(ids), OutgoingEmail.status == 'pending',
+                   OutgoingEmail.proxima_tentativa <= now)
+            .values(reservado_por=token,
+                    proxima_tentativa=now + timedelta(seconds=config['MAIL_CLAIM_TIMEOUT']))
+            .execution_options(synchronize_session=False))
+        db.session.commit()
+        # By primary key: reservado_por has no index of its own
+        return db.session.scalars(select(OutgoingEmail)
+                                  .where(OutgoingEmail.id.in_(ids), OutgoingEmail.reservado_por == token)
+                                  .order_by(OutgoingEmail.id)).all()
+
+    def _deliver(self, email):
+        """Try to send one claimed email and record the outcome; returns whether it was sent"""
+        config = self.app.config
+        email.tentativas += 1
+        email.reservado_por = None
+        try:
+            message = EmailMessage()
+            message['From'] = config['MAIL_DEFAULT_SENDER']
+            message['To'] = email.destinatario
+            message['Subject'] = email.assunto
+            message.set_content(email.corpo)
+            self._get_connection().send(message)
+        except PermanentMailError as exc:
+            email.status = 'failed'
+            email.ultimo_erro = str(exc)
+            logger.error('Email %d para %s recusado: %s', email.id, email.destinatario, exc)
+            return False
+        except (smtplib.SMTPException, OSError) as exc:
+            email.ultimo_erro = f'{type(exc).__name__}: {exc}'
+            if email.tentativas >= config['MAIL_MAX_ATTEMPTS']:
+                email.status = 'failed'
+                logger.error('Email %d para %s descartado após %d tentativas: %s',
+                             email.id, email.destinatario, email.tentativas, exc)
+            else:
+                delay = min(config['MAIL_RETRY_DELAY'] * 2 ** (email.tentativas - 1), config['MAIL_MAX_RETRY_DELAY'])
+                email.proxima_tentativa = datetime.utcnow() + timedelta(seconds=delay)
+                logger.warning('Falha ao enviar email %d (tentativa %d); nova tentativa em %ds: %s',
+                               email.id, email.tentativas, delay, exc)
+            return False
+        except Exception as exc:
+            # A header with a newline, an unencodable address...: the same row would fail again
+            email.status = 'failed'
+            email.ultimo_erro = f'{type(exc).__name__}: {exc}'
+            self._close_connection()  # The SMTP session may be mid-message
+            logger.exception('Email %d para %s não pôde ser montado ou enviado', email.id, email.destinatario)
+            return False
+
+        email.status = 'sent'
+        email.enviado_em = datetime.utcnow()
+        email.ultimo_erro = None
+        return True
+
+    def _get_connection(self):
+        if self._connection is None:
+            self._connection = SMTPConnection(self.app.config) if self.app.config['MAIL_SERVER'] else ConsoleConnection()
+        return self._connection
+
+    def _close_connection(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='mail-outbox', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        last_purge = None
+        while not self._stopping.is_set():
+            with self.app.app_context():
+                try:
+                    self.send_pending()
+                    if last_purge is None or time.monotonic() - last_purge >= self.app.config['MAIL_PURGE_INTERVAL']:
+                        last_purge = time.monotonic()
+                        purged = self.purge()
+                        if purged:
+                            logger.info('%d emails antigos removidos da fila', purged)
+                except Exception:
+                    # Database away or a bug; the thread must survive either
+                    db.session.rollback()
+                    logger.exception('Falha ao processar a fila de emails')
+                finally:
+                    db.session.remove()
+            self._wakeup.wait(self.app.config['MAIL_POLL_INTERVAL'])
+            self._wakeup.clear()
+        self._close_connection()
+
+
+mail_outbox = MailOutbox()
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib to hand over messages"""
+
+    def handle(self):
+        self._reply('220 portfolio debug SMTP sink')
+        sender, recipients = None, []
+        for line in self.rfile:
+            command = line.decode('utf-8', 'replace').rstrip('\r\n')
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                self._reply('250 localhost')
+            elif verb == 'MAIL':
+                sender, recipients = command.split(':', 1)[1].strip(), []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip())
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in self.rfile:
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                self.server.deliver(sender, recipients, b''.join(data))
+                self._reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+    def _reply(self, text):
+        self.wfile.write(text.encode() + b'\r\n')
+
+
+class DebugSMTPServer(socketserver.ThreadingTCPServer):
+    """Local SMTP server that prints what it receives, for testing the SMTP path
+
+    Point MAIL_SERVER/MAIL_PORT at it with MAIL_USE_TLS=0.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, output=print):
+        super().__init__(address, _SinkHandler)
+        self.output = output
+
+    def deliver(self, sender, recipients, data):
+        message = message_from_bytes(data, policy=policy.default)
+        body = message.get_body(('plain',))
+        self.output('=' * 60)
+        self.output(f"De: {sender}  Para: {', '.join(recipients)}")
+        self.output(f"Assunto: {message['Subject']}")
+        self.output('')
+        self.output((body.get_content() if body else '').rstrip())
+        self.output('=' * 60)
@@ -1,2 +1,5 @@
-from app import app  # noqa: F401
-import routes  # noqa: F401
+from app import create_app
+
+# Built once per process. Under gunicorn --preload that is once, in the master,
+# before workers are forked; create_app leaves no open connections behind.
+app = create_app()
@@ -0,0 +1,259 @@
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from flask import (Response, abort, before_render_template, current_app, g, has_request_context, request,
+                   template_rendered)
+from sqlalchemy import event
+from extensions import db
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class StackSampler:
+    """Samples the stacks of threads serving tracked requests
+
+    A single daemon thread wakes every interval while at least one request is
+    tracked and counts the collapsed stack of each tracked thread, so the cost
+    is a few microseconds per sample rather than tracing every call.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._samples = {}  # thread id -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._samples[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+        self._active.set()
+
+    def stop(self, thread_id):
+        with self._lock:
+            samples = self._samples.pop(thread_id, None)
+            if not self._samples:
+                self._active.clear()
+        return samples
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+class Metrics:
+    """Per-endpoint latency, SQL and template timings for Prometheus and Server-Timing
+
+    Figures are kept per process: with several gunicorn workers each scrape
+    sees the worker that answered it.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.sampler = None
+        self._lock = threading.Lock()
+        self._durations = {}  # (endpoint, method) -> Histogram
+        self._responses = Counter()  # (endpoint, method, status) -> count
+        self._sql_queries = Counter()  # endpoint -> queries
+        self._sql_seconds = defaultdict(float)  # endpoint -> seconds
+        self._template_seconds = defaultdict(float)  # endpoint -> seconds
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_BUCKETS', DEFAULT_BUCKETS)
+        app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+        # Server-Timing shows SQL counts and timings to whoever makes the request
+        app.config.setdefault('SERVER_TIMING_ENABLED', app.debug or
+                              os.environ.get('SERVER_TIMING_ENABLED', '').lower() in ('1', 'true', 'yes'))
+        app.config.setdefault('PROFILE_SLOW_REQUESTS',
+                              os.environ.get('PROFILE_SLOW_REQUESTS', '').lower() in ('1', 'true', 'yes'))
+        app.config.setdefault('PROFILE_THRESHOLD', float(os.environ.get('PROFILE_THRESHOLD', 0.5)))
+        app.config.setdefault('PROFILE_INTERVAL', 0.005)
+        app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        self.app = app
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+        if app.config['PROFILE_SLOW_REQUESTS']:
+            self.sampler = StackSampler(app.config['PROFILE_INTERVAL'])
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    # Request hooks
+
+    def _start_request(self):
+        g.metrics = {'start': time.perf_counter(), 'sql_queries': 0, 'sql_seconds': 0.0,
+                     'template_seconds': 0.0, 'render_starts': []}
+        if self.sampler is not None:
+            self.sampler.start(threading.get_ident())
+
+    def _finish_request(self, response):
+        timings = g.pop('metrics', None)
+        if timings is None:
+            return response
+        duration = time.perf_counter() - timings['start']
+        endpoint = request.endpoint or 'unmatched'
+        self._record(endpoint, request.method, response.status_code, duration, timings)
+
+        if self.app.config['SERVER_TIMING_ENABLED']:
+            response.headers.add('Server-Timing', ', '.join((
+                f"db;dur={timings['sql_seconds'] * 1000:.1f};desc=\"{timings['sql_queries']} queries\"",
+                f"tpl;dur={timings['template_seconds'] * 1000:.1f}",
+                f'app;dur={duration * 1000:.1f}',
+            )))
+
+        if self.sampler is not None:
+            samples = self.sampler.stop(threading.get_ident())
+            if samples and duration >= self.app.config['PROFILE_THRESHOLD']:
+                self._dump_profile(endpoint, duration, samples)
+        return response
+
+    def _teardown_request(self, exc):
+        # Requests that never reached after_request still have to leave the sampler
+        if self.sampler is not None:
+            self.sampler.stop(threading.get_ident())
+
+    def _record(self, endpoint, method, status, duration, timings):
+        with self._lock:
+            histogram = self._durations.get((endpoint, method))
+            if histogram is None:
+                histogram = self._durations[(endpoint, method)] = Histogram(self.app.config['METRICS_BUCKETS'])
+            histogram.observe(duration)
+            self._responses[(endpoint, method, status)] += 1
+            self._sql_queries[endpoint] += timings['sql_queries']
+            self._sql_seconds[endpoint] += timings['sql_seconds']
+            self._template_seconds[endpoint] += timings['template_seconds']
+
+    def _dump_profile(self, endpoint, duration, samples):
+        """Write collapsed stacks (flamegraph.pl / speedscope format) for a slow request"""
+        os.makedirs(self.app.config['PROFILE_DIR'], exist_ok=True)
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{int(duration * 1000)}ms.folded"
+        with open(os.path.join(self.app.config['PROFILE_DIR'], filename), 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        current_app.logger.info('Requisição lenta em %s (%.0f ms); perfil salvo em %s',
+                                endpoint, duration * 1000, filename)
+
+    # SQLAlchemy and template signal handlers
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['metrics_query_start'] = time.perf_counter()
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Background workers run queries outside any request
+        if has_request_context() and 'metrics' in g:
+            g.metrics['sql_queries'] += 1
+            g.metrics['sql_seconds'] += time.perf_counter() - conn.info['metrics_query_start']
+
+    @staticmethod
+    def _before_render(sender, template, context, **extra):
+        if has_request_context() and 'metrics' in g:
+            g.metrics['render_starts'].append(time.perf_counter())
+
+    @staticmethod
+    def _after_render(sender, template, context, **extra):
+        if has_request_context() and 'metrics' in g and g.metrics['render_starts']:
+            started = g.metrics['render_starts'].pop()
+            # Only the outermost render counts, so nested renders are not added twice
+            if not g.metrics['render_starts']:
+                g.metrics['template_seconds'] += time.perf_counter() - started
+
+    # Exposition
+
+    def metrics_view(self):
+        token = self.app.config['METRICS_TOKEN']
+        if not token:
+            abort(404)  # Not exposed until a scraper token is configured
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+            abort(403)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    def render(self):
+        """Current figures in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines += ['# HELP flask_request_duration_seconds Request latency by endpoint.',
+                      '# TYPE flask_request_duration_seconds histogram']
+            for (endpoint, method), histogram in sorted(self._durations.items()):
+                labels = f'endpoint="{_label(endpoint)}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'flask_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'flask_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'flask_request_duration_seconds_sum{{{labels}}} {histogram.total}')
+                lines.append(f'flask_request_duration_seconds_count{{{labels}}} {histogram.count}')
+
+            lines += ['# HELP flask_responses_total Responses by endpoint and status.',
+                      '# TYPE flask_responses_total counter']
+            for (endpoint, method, status), count in sorted(self._responses.items()):
+                lines.append(f'flask_responses_total{{endpoint="{_label(endpoint)}",method="{method}",'
+                             f'status="{status}"}} {count}')
+
+            for name, help_text, values in (
+                    ('flask_sql_queries_total', 'SQL statements executed while serving the endpoint.',
+                     self._sql_queries),
+                    ('flask_sql_seconds_total', 'Time spent in SQL while serving the endpoint.',
+                     self._sql_seconds),
+                    ('flask_template_seconds_total', 'Time spent rendering templates for the endpoint.',
+                     self._template_seconds)):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{_label(endpoint)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -19,16 +19,32 @@ class User(db.Model):
     comments = db.relationship('Comment', backref='user', lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='user', lazy=True, cascade='all, delete-orphan')
     notifications = db.relationship('Notification', backref='user', lazy=True, cascade='all, delete-orphan')
+    notification_archives = db.relationship('NotificationArchive', backref='user', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_user_reset_token', 'reset_token'),
+        # The about page looks up the site owner
+        db.Index('ix_user_is_admin', 'is_admin'),
+    )
 
     def __repr__(self):
         return f'<User {self.nome}>'
 
+# Association between projects and their normalized tags
+project_tag = db.Table(
+    'project_tag',
+    db.Column('project_id', db.Integer, db.ForeignKey('project.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_project_tag_tag_project', 'tag_id', 'project_id'),
+)
+
 class Project(db.Model):
     """Model for projects"""
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(100), nullable=False)
     descricao = db.Column(db.Text, nullable=False)
     imagem_url = db.Column(db.String(200))
+    imagem_variants = db.Column(db.JSON(none_as_null=True))  # Resized WebP/JPEG paths, see images.py
     tags = db.Column(db.String(200))  # Comma-separated tags
     status = db.Column(db.String(20), nullable=False, default='draft')  # 'draft' or 'published'
     likes_count = db.Column(db.Integer, default=0)
@@ -39,10 +55,32 @@ class Project(db.Model):
     # Relationships
     comments = db.relationship('Comment', backref='project', lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='project', lazy=True, cascade='all, delete-orphan')
+    tag_list = db.relationship('Tag', secondary=project_tag, lazy=True, order_by='Tag.nome',
+                               backref=db.backref('projects', lazy='dynamic'))
+
+    # Public listings filter on status and sort by date or popularity
+    __table_args__ = (
+        db.Index('ix_project_status_criado_em', 'status', 'criado_em'),
+        db.Index('ix_project_status_likes_count', 'status', 'likes_count'),
+        # Admin listing of every project, drafts included
+        db.Index('ix_project_criado_em', 'criado_em'),
+    )
 
     def __repr__(self):
         return f'<Project {self.titulo}>'
 
+class Tag(db.Model):
+    """Model for normalized project tags"""
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(50), nullable=False)
+    slug = db.Column(db.String(50), nullable=False, unique=True)
+    projects_count = db.Column(db.Integer, nullable=False, default=0)  # Published projects only
+    
+    __table_args__ = (db.Index('ix_tag_projects_count', 'projects_count'),)
+
+    def __repr__(self):
+        return f'<Tag {self.nome}>'
+
 class Achievement(db.Model):
     """Model for achievements"""
     id = db.Column(db.Integer, primary_key=True)
@@ -50,8 +88,12 @@ class Achievement(db.Model):
     descricao = db.Column(db.Text, nullable=False)
     data = db.Column(db.DateTime, nullable=False)
     imagem_url = db.Column(db.String(200))
+    imagem_variants = db.Column(db.JSON(none_as_null=True))
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (db.Index('ix_achievement_user_data', 'user_id', 'data'),)
+
     def __repr__(self):
         return f'<Achievement {self.titulo}>'
 
@@ -62,6 +104,13 @@ class Comment(db.Model):
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    
+    __table_args__ = (
+        # Keyset pagination of a project's comments walks (project_id, criado_em, id)
+        db.Index('ix_comment_project_criado_em', 'project_id', 'criado_em', 'id'),
+        # Recent activity scanned by the trending job
+        db.Index('ix_comment_criado_em', 'criado_em'),
+    )
 
     def __repr__(self):
         return f'<Comment {self.id} by User {self.user_id}>'
@@ -71,9 +120,13 @@ class Like(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)  # NULL for likes older than the column
     
-    # Ensure a user can only like a project once
-    __table_args__ = (db.UniqueConstraint('user_id', 'project_id', name='unique_user_project_like'),)
+    __table_args__ = (
+        # Ensure a user can only like a project once
+        db.UniqueConstraint('user_id', 'project_id', name='unique_user_project_like'),
+        db.Index('ix_like_criado_em', 'criado_em'),
+    )
 
     def __repr__(self):
         return f'<Like User {self.user_id} - Project {self.project_id}>'
@@ -86,6 +139,86 @@ class Notification(db.Model):
     lida = db.Column(db.Boolean, default=False)
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    __table_args__ = (
+        # Unread lookups and the bulk mark-as-read UPDATE
+        db.Index('ix_notification_user_lida_criado_em', 'user_id', 'lida', 'criado_em'),
+        # Keyset pagination of the inbox
+        db.Index('ix_notification_user_criado_em', 'user_id', 'criado_em', 'id'),
+    )
 
     def __repr__(self):
         return f'<Notification {self.tipo} for User {self.user_id}>'
+
+class NotificationArchive(db.Model):
+    """Monthly per-type totals of notifications removed by the retention job"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    periodo = db.Column(db.Date, nullable=False)  # First day of the month
+    total = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'tipo', 'periodo', name='unique_notification_archive_period'),)
+
+    def __repr__(self):
+        return f'<NotificationArchive {self.tipo} {self.periodo} for User {self.user_id}>'
+
+class Counter(db.Model):
+    """Materialized row counts kept up to date by the write paths"""
+    nome = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<Counter {self.nome}={self.valor}>'
+
+class TrendingProject(db.Model):
+    """Top of the trending ranking, rewritten as a whole by trending.py"""
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id', ondelete='CASCADE'), primary_key=True)
+    posicao = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    calculado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_trending_project_posicao', 'posicao'),)
+
+    def __repr__(self):
+        return f'<TrendingProject {self.posicao}: {self.project_id}>'
+
+class TrendingState(db.Model):
+    """Single row recording when the ranking was last computed, even when it came out empty
+
+    Workers claim a refresh with a conditional UPDATE on it, see trending.py.
+    """
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    calculado_em = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<TrendingState {self.calculado_em}>'
+
+class OutgoingEmail(db.Model):
+    """Outbox of emails waiting for mail.py's sender thread"""
+    id = db.Column(db.Integer, primary_key=True)
+    destinatario = db.Column(db.String(120), nullable=False)
+    assunto = db.Column(db.String(200), nullable=False)
+    corpo = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'sent' or 'failed'
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    reservado_por = db.Column(db.String(32))  # Sender pass currently holding the row
+    ultimo_erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    enviado_em = db.Column(db.DateTime)
+    
+    # The sender polls for due pending rows
+    __table_args__ = (db.Index('ix_outgoing_email_status_proxima', 'status', 'proxima_tentativa'),)
+
+    def __repr__(self):
+        return f'<OutgoingEmail {self.id} to {self.destinatario} ({self.status})>'
+
+class SchemaMigration(db.Model):
+    """Versions from schema.MIGRATIONS already applied to this database"""
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    descricao = db.Column(db.String(200), nullable=False)
+    aplicado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SchemaMigration {self.version}>'
@@ -0,0 +1,204 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from extensions import db
+from models import Notification, NotificationArchive
+import counters
+
+logger = logging.getLogger(__name__)
+
+# Single-event messages keep the wording used before notifications were queued
+MESSAGES = {
+    'like': '{actor} curtiu seu projeto "{titulo}"',
+    'comment': '{actor} comentou no projeto "{titulo}"',
+}
+AGGREGATED_MESSAGES = {
+    'like': '{count} pessoas curtiram seu projeto "{titulo}"',
+    'comment': '{count} pessoas comentaram no projeto "{titulo}"',
+}
+
+
+def build_notifications(events):
+    """Collapse events for the same (tipo, recipient, project) into one Notification row each"""
+    groups = OrderedDict()
+    for event in events:
+        key = (event['tipo'], event['user_id'], event['project_id'])
+        group = groups.setdefault(key, {'event': event, 'actors': OrderedDict(), 'criado_em': event['criado_em']})
+        group['actors'][event['actor']] = True
+        group['criado_em'] = max(group['criado_em'], event['criado_em'])
+
+    rows = []
+    for (tipo, user_id, _), group in groups.items():
+        actors = list(group['actors'])
+        if len(actors) > 1:
+            mensagem = AGGREGATED_MESSAGES[tipo].format(count=len(actors), titulo=group['event']['titulo'])
+        else:
+            mensagem = MESSAGES[tipo].format(actor=actors[0], titulo=group['event']['titulo'])
+        rows.append({'tipo': tipo, 'mensagem': mensagem, 'lida': False,
+                     'criado_em': group['criado_em'], 'user_id': user_id})
+    return rows
+
+
+def mark_all_read(user_id):
+    """Mark every unread notification of a user as read with a single UPDATE"""
+    stmt = (db.update(Notification)
+            .where(Notification.user_id == user_id, Notification.lida.is_(False))
+            .values(lida=True)
+            .execution_options(synchronize_session=False))
+    marked = db.session.execute(stmt).rowcount
+    counters.bump('unread_notifications', -marked)
+    return marked
+
+
+def compact_notifications(max_age_days, batch_size=5000):
+    """Roll read notifications older than max_age_days into monthly archive totals
+
+    Works in id-ordered batches so each transaction stays short. Returns the
+    number of notifications removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    removed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Notification.id, Notification.user_id, Notification.tipo, Notification.criado_em)
+            .where(Notification.id > last_id, Notification.lida.is_(True), Notification.criado_em < cutoff)
+            .order_by(Notification.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        totals = Counter((row.user_id, row.tipo, row.criado_em.date().replace(day=1)) for row in rows)
+        for (user_id, tipo, periodo), total in totals.items():
+            archive = NotificationArchive.query.filter_by(user_id=user_id, tipo=tipo, periodo=periodo).first()
+            if archive is None:
+                db.session.add(NotificationArchive(user_id=user_id, tipo=tipo, periodo=periodo, total=total))
+            else:
+                archive.total += total
+
+        ids = [row.id for row in rows]
+        db.session.execute(db.delete(Notification).where(Notification.id.in_(ids))
+                           .execution_options(synchronize_session=False))
+        db.session.commit()
+        removed += len(ids)
+        last_id = ids[-1]
+    return removed
+
+
+class NotificationQueue:
+    """Bounded in-process queue of notification events drained by a worker thread
+
+    Request handlers only enqueue. The worker waits a short window after the first
+    event so bursts can be aggregated, then batch-inserts the resulting rows.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._queue = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._write_listeners = []
+
+    def init_app(self, app):
+        app.config.setdefault('NOTIFICATION_QUEUE_SIZE', 10000)
+        app.config.setdefault('NOTIFICATION_BATCH_SIZE', 500)
+        app.config.setdefault('NOTIFICATION_FLUSH_INTERVAL', 1.0)
+        app.config.setdefault('NOTIFICATION_ENQUEUE_TIMEOUT', 0.5)
+        app.config.setdefault('NOTIFICATION_RETENTION_DAYS', 90)
+        self.app = app
+        self._queue = queue.Queue(maxsize=app.config['NOTIFICATION_QUEUE_SIZE'])
+        self.batch_size = app.config['NOTIFICATION_BATCH_SIZE']
+        self.interval = app.config['NOTIFICATION_FLUSH_INTERVAL']
+        self.enqueue_timeout = app.config['NOTIFICATION_ENQUEUE_TIMEOUT']
+        atexit.register(self.shutdown)
+
+    def on_write(self, listener):
+        """Register listener() to run in an app context after each batch is committed"""
+        self._write_listeners.append(listener)
+        return listener
+
+    def enqueue(self, tipo, user_id, project_id, titulo, actor):
+        """Queue a notification event; blocks briefly when full, then drops it
+
+        Returns False when the event was dropped.
+        """
+        event = {'tipo': tipo, 'user_id': user_id, 'project_id': project_id, 'titulo': titulo,
+                 'actor': actor, 'criado_em': datetime.utcnow()}
+        self._ensure_worker()
+        try:
+            self._queue.put(event, timeout=self.enqueue_timeout)
+        except queue.Full:
+            logger.warning('Fila de notificações cheia; evento %s descartado', tipo)
+            return False
+        return True
+
+    def flush(self):
+        """Drain everything currently queued and write it in batches"""
+        while self._drain(block=False):
+            pass
+
+    def shutdown(self):
+        self._stopping.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=self.interval * 2 + 5)
+        self.flush()
+
+    def _drain(self, block):
+        """Collect up to one batch of events and insert them; returns the number of events"""
+        with self._drain_lock:
+            events = []
+            try:
+                if block:
+                    events.append(self._queue.get(timeout=self.interval))
+                    # Give a burst a moment to arrive so it can be aggregated
+                    deadline = time.monotonic() + self.interval
+                    while len(events) < self.batch_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        events.append(self._queue.get(timeout=remaining))
+                while len(events) < self.batch_size:
+                    events.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if events:
+                self._write(events)
+            return len(events)
+
+    def _write(self, events):
+        rows = build_notifications(events)
+        with self.app.app_context():
+            try:
+                db.session.execute(db.insert(Notification), rows)
+                counters.bump('unread_notifications', len(rows))
+                db.session.commit()
+                for listener in self._write_listeners:
+                    listener()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Falha ao gravar %d notificações', len(rows))
+            finally:
+                db.session.remove()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='notification-queue', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._drain(block=True)
+
+
+notification_queue = NotificationQueue()
@@ -0,0 +1,43 @@
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode a (sort value, id) keyset position as an opaque string"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    return f'{sort_value}_{row_id}'
+
+
+def decode_cursor(cursor, sort_type=datetime):
+    """Decode a cursor from encode_cursor, raising ValueError when malformed"""
+    sort_value, row_id = cursor.rsplit('_', 1)
+    if sort_type is datetime:
+        sort_value = datetime.fromisoformat(sort_value)
+    else:
+        sort_value = sort_type(sort_value)
+    return sort_value, int(row_id)
+
+
+def keyset_order(query, sort_column, id_column, cursor=None, sort_type=datetime):
+    """Order a query or select() by (sort_column, id_column) descending, starting after cursor"""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, sort_type)
+        query = query.where(or_(sort_column < sort_value,
+                                and_(sort_column == sort_value, id_column < row_id)))
+    return query.order_by(sort_column.desc(), id_column.desc())
+
+
+def keyset_page(query, sort_column, id_column, cursor=None, per_page=20, sort_type=datetime):
+    """Fetch one page ordered by (sort_column, id_column) descending
+
+    Returns the rows and the cursor for the next page (None on the last page).
+    """
+    query = keyset_order(query, sort_column, id_column, cursor, sort_type)
+    rows = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
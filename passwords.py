@@ -0,0 +1,77 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from werkzeug.exceptions import TooManyRequests
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+
+class HashingBusy(TooManyRequests):
+    """Raised when every hashing slot is taken; rendered as a 429"""
+    description = 'Muitas tentativas de autenticação no momento. Tente novamente em instantes.'
+
+
+def normalize_method(method):
+    """Spell out werkzeug's defaults so stored hash prefixes compare exactly"""
+    name, *params = method.split(':')
+    if name == 'scrypt':
+        n, r, p = (params + ['32768', '8', '1'][len(params):])[:3]
+        return f'scrypt:{n}:{r}:{p}'
+    if name == 'pbkdf2':
+        digest, iterations = (params + ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)][len(params):])[:2]
+        return f'pbkdf2:{digest}:{iterations}'
+    return method
+
+
+class PasswordHasher:
+    """Runs password KDFs on a small dedicated pool instead of the request worker
+
+    hashlib's scrypt and pbkdf2 release the GIL, so a thread pool caps the
+    CPU spent on auth. Callers beyond max_pending are rejected with a 429
+    rather than queueing behind a login burst.
+    """
+
+    def __init__(self):
+        self.method = normalize_method('scrypt')
+        self.timeout = 10
+        self._executor = None
+        self._slots = None
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 8)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+        self.method = normalize_method(app.config['PASSWORD_HASH_METHOD'])
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        self._executor = ThreadPoolExecutor(max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                                            thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_MAX_PENDING'])
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy(retry_after=1)
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the KDF is done (or cancelled before it started),
+        # not just while this caller waits for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy(retry_after=self.timeout)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, senha_hash, password):
+        return self._run(check_password_hash, senha_hash, password)
+
+    def needs_rehash(self, senha_hash):
+        """True when the stored hash was made with other parameters than the configured ones"""
+        return senha_hash.split('$', 1)[0] != self.method
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,111 @@
+import itertools
+import os
+import json
+import queue
+import threading
+from collections import deque
+
+
+class TooManySubscribers(Exception):
+    """Raised when the subscriber cap is reached"""
+
+
+class Subscription:
+    """One connected SSE client"""
+
+    def __init__(self, broker, backlog, maxsize):
+        self.broker = broker
+        self.queue = queue.Queue(maxsize=maxsize)
+        for event in backlog:
+            self.queue.put_nowait(event)
+
+    def get(self, timeout):
+        """Next (id, type, data) event, or None when the timeout passes without one"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # A stalled client loses its oldest event rather than blocking publishers
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(event)
+            except queue.Full:
+                # Another publisher refilled the slot first; the client reloads on reconnect
+                pass
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """In-process pub/sub with a replay buffer for Last-Event-ID reconnects
+
+    Subscribers only see events published in the same worker process.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=200)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.max_subscribers = 4
+        self.heartbeat_interval = 15
+
+    def init_app(self, app):
+        # Each open stream holds one of the worker's threads (gunicorn --threads 16
+        # in .replit); keep most of them free for ordinary requests
+        app.config.setdefault('SSE_MAX_SUBSCRIBERS', int(os.environ.get('SSE_MAX_SUBSCRIBERS', 4)))
+        app.config.setdefault('SSE_HEARTBEAT_INTERVAL', 15)
+        app.config.setdefault('SSE_HISTORY_SIZE', 200)
+        self.max_subscribers = app.config['SSE_MAX_SUBSCRIBERS']
+        self.heartbeat_interval = app.config['SSE_HEARTBEAT_INTERVAL']
+        self._history = deque(self._history, maxlen=app.config['SSE_HISTORY_SIZE'])
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = (next(self._ids), event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber, replaying events newer than last_event_id"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers()
+            backlog = []
+            if last_event_id is not None:
+                backlog = [event for event in self._history if event[0] > last_event_id]
+            subscription = Subscription(self, backlog, maxsize=max(self._history.maxlen, len(backlog)))
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stream(self, subscription):
+        """Generate the text/event-stream body for a subscription"""
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                event = subscription.get(self.heartbeat_interval)
+                if event is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                event_id, event_type, data = event
+                yield f'id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n'
+        finally:
+            subscription.close()
+
+
+broker = EventBroker()
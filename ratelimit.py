@@ -0,0 +1,149 @@
+import os
+import re
+import time
+from functools import wraps
+from flask import current_app, request, session
+from werkzeug.exceptions import TooManyRequests
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+class RateLimited(TooManyRequests):
+    """Raised when a client runs out of tokens for an endpoint; rendered as a 429"""
+    description = 'Muitas requisições em pouco tempo. Aguarde um instante e tente novamente.'
+
+
+def parse_rate(rate):
+    """'10/minute' -> (10, 60.0)"""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(second|minute|hour|day)s?\s*', rate)
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f'Taxa inválida: {rate!r}')
+    return int(match.group(1)), float(PERIODS[match.group(2)])
+
+
+class MemoryBucketStore:
+    """Token buckets for one process, without locks
+
+    Each bucket is a single float (GCRA: the time at which it will be full
+    again), so an update is one dict read and one dict write, each atomic under
+    the GIL. Two threads racing on the same key can both get a token; for
+    throttling that is an acceptable price for never blocking.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._full_at = {}
+
+    def consume(self, key, interval, capacity):
+        """Take a token; returns 0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        full_at = max(self._full_at.get(key, now), now)
+        new_full_at = full_at + interval
+        retry_after = new_full_at - now - capacity * interval
+        if retry_after > 0:
+            return retry_after
+        self._full_at[key] = new_full_at
+        if len(self._full_at) > self.max_keys:
+            self._prune(now)
+        return 0
+
+    def _prune(self, now):
+        # Full buckets carry no state worth keeping
+        for key, full_at in list(self._full_at.items()):
+            if full_at <= now:
+                self._full_at.pop(key, None)
+
+
+class RedisBucketStore:
+    """Token buckets shared by every worker, updated atomically by a Lua script"""
+
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local interval = tonumber(ARGV[2])
+    local capacity = tonumber(ARGV[3])
+    local full_at = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+    local new_full_at = full_at + interval
+    local retry_after = new_full_at - now - capacity * interval
+    if retry_after > 0 then
+        return tostring(retry_after)
+    end
+    redis.call('SET', KEYS[1], tostring(new_full_at), 'PX', math.ceil((new_full_at - now) * 1000))
+    return '0'
+    """
+
+    def __init__(self, url, prefix='portfolio:ratelimit:'):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError('RATELIMIT_BACKEND=redis requer o pacote "redis" instalado.') from exc
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._consume = self.client.register_script(self.SCRIPT)
+
+    def consume(self, key, interval, capacity):
+        # Wall clock, since the buckets are shared between hosts
+        return float(self._consume(keys=[self.prefix + key], args=[time.time(), interval, capacity]))
+
+
+class RateLimiter:
+    """Flask extension wrapper that picks the bucket store from the app config"""
+
+    def __init__(self):
+        self.store = MemoryBucketStore()
+        self.enabled = True
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED',
+                              os.environ.get('RATELIMIT_ENABLED', '1').lower() in ('1', 'true', 'yes'))
+        app.config.setdefault('RATELIMIT_BACKEND', os.environ.get('RATELIMIT_BACKEND', 'memory'))
+        app.config.setdefault('RATELIMIT_REDIS_URL',
+                              os.environ.get('RATELIMIT_REDIS_URL', app.config.get('CACHE_REDIS_URL')))
+        app.config.setdefault('RATELIMIT_MAX_KEYS', 10000)
+
+        self.enabled = app.config['RATELIMIT_ENABLED']
+        if app.config['RATELIMIT_BACKEND'] == 'redis':
+            self.store = RedisBucketStore(app.config['RATELIMIT_REDIS_URL'])
+        else:
+            self.store = MemoryBucketStore(max_keys=app.config['RATELIMIT_MAX_KEYS'])
+        app.extensions['ratelimit'] = self
+
+    def hit(self, key, rate, burst=None):
+        """Take a token from key's bucket, raising RateLimited when it is empty"""
+        count, period = parse_rate(rate)
+        retry_after = self.store.consume(key, period / count, burst or count)
+        if retry_after:
+            current_app.logger.info('Limite de requisições atingido para %s', key)
+            raise RateLimited(retry_after=max(int(retry_after + 0.999), 1))
+
+
+rate_limiter = RateLimiter()
+
+
+def client_key(by='user'):
+    """The logged-in user for by='user' (the client IP when anonymous), or the IP for by='ip'
+
+    create_app wraps the app in ProxyFix(x_for=PROXY_HOPS), so request.remote_addr
+    is the address the outermost trusted proxy appended to X-Forwarded-For;
+    values a client puts earlier in that header are ignored.
+    """
+    if by == 'user' and session.get('user_id'):
+        return f"user:{session['user_id']}"
+    return f'ip:{request.remote_addr}'
+
+
+def rate_limit(rate, burst=None, by='user', methods=('POST',)):
+    """Throttle a view to rate ('5/minute') per client, allowing bursts of up to burst requests
+
+    Only requests with one of methods count, so a form view can still be
+    displayed freely.
+    """
+    parse_rate(rate)  # Fail at import time on a bad spec
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if rate_limiter.enabled and request.method in methods:
+                rate_limiter.hit(f'{request.endpoint}:{client_key(by)}', rate, burst)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -1,46 +1,129 @@
-import os
 from datetime import datetime, timedelta
-from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, session, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from sqlalchemy import desc, func
-from extensions import db
-from models import User, Project, Achievement, Comment, Like, Notification
+import json
+from flask import Blueprint, Response, current_app, make_response, render_template, request, redirect, url_for, flash, session, jsonify, abort, stream_with_context
+from markupsafe import Markup
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import joinedload, selectinload
+from extensions import db, cache
+from models import User, Project, Achievement, Comment, Like, Notification, Tag
 from forms import (RegistrationForm, LoginForm, PasswordResetRequestForm, 
                   PasswordResetForm, ProjectForm, AchievementForm, CommentForm)
-from auth import login_required, admin_required, generate_password_reset_token, send_password_reset_email
+from auth import (login_required, admin_required, get_current_user,
+                  generate_password_reset_token, send_password_reset_email)
+from pagination import encode_cursor, keyset_order, keyset_page
+from tags import parse_tags, sync_project_tags, refresh_tag_counts
+import search as search_index
+import likes
+import counters
+from notifications import notification_queue, mark_all_read
+from pubsub import broker, TooManySubscribers
+from images import image_pipeline
+from trending import trending_ranker, trending_projects
+from storage import upload_store
+from http_cache import make_etag, not_modified, add_cache_headers
+from passwords import password_hasher
+from ratelimit import rate_limit
 
 # Create Blueprint
 main_bp = Blueprint('main', __name__)
 
-# Configure upload folder
-UPLOAD_FOLDER = 'static/uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-# Upload configuration will be set in the app factory
+@main_bp.app_context_processor
+def inject_current_user():
+    return {'current_user': get_current_user()}
 
 def save_uploaded_file(file):
     """Save uploaded file and return the path"""
     if file and file.filename:
-        filename = secure_filename(file.filename)
-        # Add timestamp to avoid conflicts
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-        filename = timestamp + filename
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        return f'uploads/{filename}'
+        # Content-addressed: identical uploads share one file
+        return upload_store.save(file)
     return None
 
+# Home page cache
+HOME_CACHE_KEY = 'home:projects'
+
+def build_home_projects():
+    """Query the home page project lists and render their cards"""
+    published = Project.query.options(selectinload(Project.tag_list)).filter_by(status='published')
+    recent_projects = published.order_by(desc(Project.criado_em)).limit(6).all()
+    # Ranked in the background by recent, decayed activity; all-time likes fill the gaps
+    popular_projects = trending_projects(published, 6)
+    if len(popular_projects) < 6:
+        popular_projects += (published.filter(Project.id.notin_([p.id for p in popular_projects]))
+                             .order_by(desc(Project.likes_count)).limit(6 - len(popular_projects)).all())
+    
+    def render_cards(projects):
+        return [Markup(render_template('partials/project_card.html', project=project)) for project in projects]
+    
+    shown = recent_projects + popular_projects
+    return {
+        'recent_cards': render_cards(recent_projects),
+        'popular_cards': render_cards(popular_projects),
+        # The infinite feed below the cards picks up after the recent ones
+        'recent_cursor': (encode_cursor(recent_projects[-1].criado_em, recent_projects[-1].id)
+                          if len(recent_projects) == 6 else None),
+        'same_order': [p.id for p in recent_projects] == [p.id for p in popular_projects],
+        # The ETag itself is made per request, so it follows the running build
+        'versions': [(p.id, p.atualizado_em, p.likes_count) for p in shown],
+        'last_modified': max((p.atualizado_em for p in shown if p.atualizado_em), default=None),
+    }
+
+def invalidate_home_cache(*statuses):
+    """Drop the cached home page if any of the given project statuses is visible there"""
+    if 'published' in statuses:
+        cache.delete(HOME_CACHE_KEY)
+
+@likes.like_buffer.on_flush
+def _likes_flushed(project_ids):
+    """Buffered likes only reach the home page once they are written"""
+    cache.delete(HOME_CACHE_KEY)
+
+@trending_ranker.on_refresh
+def _trending_refreshed():
+    cache.delete(HOME_CACHE_KEY)
+
+@notification_queue.on_write
+def _notifications_written():
+    """Repeated events fold into one row, so dashboards are sent the total rather than +1"""
+    publish_unread_notifications()
+
+def publish_unread_notifications():
+    broker.publish('notifications', {'unread': counters.get_counter('unread_notifications')})
+
+@image_pipeline.on_ready
+def _image_variants_ready(kind, obj_id):
+    """Cached cards were rendered without srcset; let them pick up the variants"""
+    if kind == 'project':
+        cache.delete(HOME_CACHE_KEY)
+
+# Comment feed
+COMMENTS_PER_PAGE = 20
+
+def get_comments_page(project_id, cursor=None):
+    """Return one page of comments (newest first) with their authors loaded in the same query"""
+    query = Comment.query.options(joinedload(Comment.user)).filter_by(project_id=project_id)
+    try:
+        return keyset_page(query, Comment.criado_em, Comment.id, cursor, COMMENTS_PER_PAGE)
+    except ValueError:
+        abort(400)
+
+def get_visible_project(id):
+    """Load a project, hiding drafts from non-admins"""
+    project = Project.query.get_or_404(id)
+    user = get_current_user()
+    if project.status != 'published' and not (user and user.is_admin):
+        return None
+    return project
+
 # Authentication Routes
 @main_bp.route('/register', methods=['GET', 'POST'])
+@rate_limit('10/hour', burst=3, by='ip')
 def register():
-    if 'user_id' in session:
+    if get_current_user():
         return redirect(url_for('main.index'))
     
     form = RegistrationForm()
     if form.validate_on_submit():
-        senha_hash = generate_password_hash(form.senha.data)
+        senha_hash = password_hasher.hash(form.senha.data)
         user = User(
             nome=form.nome.data,
             email=form.email.data,
@@ -55,18 +138,23 @@ def register():
     return render_template('auth/register.html', form=form)
 
 @main_bp.route('/login', methods=['GET', 'POST'])
+@rate_limit('10/minute', burst=5, by='ip')
 def login():
-    if 'user_id' in session:
+    if get_current_user():
         return redirect(url_for('main.index'))
     
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
         
-        if user and check_password_hash(user.senha_hash, form.senha.data):
+        if user and password_hasher.verify(user.senha_hash, form.senha.data):
+            # Upgrade hashes made with older parameters while the password is at hand
+            if password_hasher.needs_rehash(user.senha_hash):
+                user.senha_hash = password_hasher.hash(form.senha.data)
+                db.session.commit()
+            
+            # Name and admin flag are read through get_current_user, never trusted from the cookie
             session['user_id'] = user.id
-            session['user_name'] = user.nome
-            session['is_admin'] = user.is_admin
             
             if form.lembrar.data:
                 session.permanent = True
@@ -87,6 +175,7 @@ def logout():
     return redirect(url_for('main.index'))
 
 @main_bp.route('/forgot-password', methods=['GET', 'POST'])
+@rate_limit('5/hour', burst=2, by='ip')
 def forgot_password():
     form = PasswordResetRequestForm()
     if form.validate_on_submit():
@@ -95,9 +184,9 @@ def forgot_password():
             token = generate_password_reset_token()
             user.reset_token = token
             user.reset_token_expires = datetime.utcnow() + timedelta(hours=1)
-            db.session.commit()
-            
+            # The email is only queued here, committed together with the token
             send_password_reset_email(user.email, token)
+            db.session.commit()
             flash('Instruções para redefinir a senha foram enviadas para seu email.', 'info')
         else:
             flash('Email não encontrado.', 'warning')
@@ -114,7 +203,7 @@ def reset_password(token):
     
     form = PasswordResetForm()
     if form.validate_on_submit():
-        user.senha_hash = generate_password_hash(form.senha.data)
+        user.senha_hash = password_hasher.hash(form.senha.data)
         user.reset_token = None
         user.reset_token_expires = None
         db.session.commit()
@@ -127,69 +216,102 @@ def reset_password(token):
 # Public Routes
 @main_bp.route('/')
 def index():
-    # Get recent and most liked projects
-    recent_projects = Project.query.filter_by(status='published').order_by(desc(Project.criado_em)).limit(6).all()
-    popular_projects = Project.query.filter_by(status='published').order_by(desc(Project.likes_count)).limit(6).all()
+    # Recent and most liked projects are served from cache between writes
+    home = cache.get_or_set(HOME_CACHE_KEY, build_home_projects)
+    etag = make_etag(home['versions'])
+    
+    response = not_modified(etag, home['last_modified'])
+    if response:
+        return response
     
-    return render_template('index.html', recent_projects=recent_projects, popular_projects=popular_projects)
+    response = make_response(render_template('index.html', **home))
+    return add_cache_headers(response, etag, home['last_modified'])
 
 @main_bp.route('/project/<int:id>')
 def project_detail(id):
-    project = Project.query.get_or_404(id)
-    if project.status != 'published' and not (session.get('is_admin')):
+    project = get_visible_project(id)
+    if project is None:
         flash('Projeto não encontrado.', 'warning')
         return redirect(url_for('main.index'))
     
-    comments = Comment.query.filter_by(project_id=id).order_by(desc(Comment.criado_em)).all()
+    comments_count, last_comment_id, last_comment_at = db.session.query(
+        func.count(Comment.id), func.max(Comment.id), func.max(Comment.criado_em)
+    ).filter_by(project_id=id).one()
+    etag = make_etag(project.id, project.atualizado_em, project.likes_count, comments_count, last_comment_id)
+    last_modified = max(filter(None, (project.atualizado_em, last_comment_at)), default=None)
+    
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+    
+    comments, next_cursor = get_comments_page(id)
     
     # Check if current user liked this project
     user_liked = False
     if 'user_id' in session:
-        like = Like.query.filter_by(user_id=session['user_id'], project_id=id).first()
-        user_liked = bool(like)
+        user_liked = likes.like_buffer.pending_state(session['user_id'], id)
+        if user_liked is None:
+            like = Like.query.filter_by(user_id=session['user_id'], project_id=id).first()
+            user_liked = bool(like)
     
     form = CommentForm()
-    return render_template('project_detail.html', project=project, comments=comments, 
-                         user_liked=user_liked, form=form)
+    response = make_response(render_template('project_detail.html', project=project, comments=comments, 
+                                             comments_count=comments_count, next_cursor=next_cursor,
+                                             user_liked=user_liked, form=form))
+    return add_cache_headers(response, etag, last_modified)
+
+@main_bp.route('/project/<int:id>/comments')
+def project_comments(id):
+    """JSON page of comments for the "load more" button"""
+    if get_visible_project(id) is None:
+        abort(404)
+    
+    comments, next_cursor = get_comments_page(id, request.args.get('cursor'))
+    return jsonify({
+        'comments': [{
+            'id': comment.id,
+            'autor': comment.user.nome,
+            'conteudo': comment.conteudo,
+            'criado_em': comment.criado_em.strftime('%d/%m/%Y às %H:%M'),
+        } for comment in comments],
+        'next_cursor': next_cursor,
+    })
 
 @main_bp.route('/project/<int:id>/like', methods=['POST'])
 @login_required
+@rate_limit('30/minute', burst=10)
 def toggle_like(id):
-    project = Project.query.get_or_404(id)
-    user_id = session['user_id']
+    # Only the columns needed here, with the owner's admin flag in the same query
+    project = db.session.execute(
+        select(Project.titulo, Project.user_id, Project.status, Project.likes_count, User.is_admin)
+        .join(User, Project.user_id == User.id)
+        .where(Project.id == id)
+    ).first()
+    if project is None:
+        abort(404)
     
-    existing_like = Like.query.filter_by(user_id=user_id, project_id=id).first()
+    user = get_current_user()
+    liked, likes_count, applied, changed = likes.toggle_like(user.id, id, project.likes_count)
     
-    if existing_like:
-        # Unlike
-        db.session.delete(existing_like)
-        project.likes_count = max(0, project.likes_count - 1)
-        liked = False
-    else:
-        # Like
-        like = Like(user_id=user_id, project_id=id)
-        db.session.add(like)
-        project.likes_count += 1
-        liked = True
-        
-        # Create notification for admin
-        if project.user.is_admin:
-            notification = Notification(
-                tipo='like',
-                mensagem=f'{session.get("user_name", "Usuário")} curtiu seu projeto "{project.titulo}"',
-                user_id=project.user_id
-            )
-            db.session.add(notification)
+    if applied:
+        db.session.commit()
+        if changed:
+            invalidate_home_cache(project.status)
     
-    db.session.commit()
+    if changed:
+        # Notify the admin off the request path
+        if liked and project.is_admin:
+            notification_queue.enqueue('like', project.user_id, id, project.titulo, user.nome)
+        broker.publish('like', {'project_id': id, 'liked': liked, 'likes_count': likes_count})
     
     if request.headers.get('Content-Type') == 'application/json':
-        return jsonify({'liked': liked, 'likes_count': project.likes_count})
+        return jsonify({'liked': liked, 'likes_count': likes_count})
     
     return redirect(url_for('main.project_detail', id=id))
 
 @main_bp.route('/project/<int:id>/comment', methods=['POST'])
 @login_required
+@rate_limit('10/minute', burst=3)
 def add_comment(id):
     project = Project.query.get_or_404(id)
     form = CommentForm()
@@ -201,54 +323,212 @@ def add_comment(id):
             project_id=id
         )
         db.session.add(comment)
+        counters.bump('comments', 1)
+        db.session.commit()
         
-        # Create notification for admin
+        # Notify the admin off the request path
         if project.user.is_admin:
-            notification = Notification(
-                tipo='comment',
-                mensagem=f'{session.get("user_name", "Usuário")} comentou no projeto "{project.titulo}"',
-                user_id=project.user_id
-            )
-            db.session.add(notification)
-        
-        db.session.commit()
+            notification_queue.enqueue('comment', project.user_id, id, project.titulo,
+                                       get_current_user().nome)
+        broker.publish('comment', {'project_id': id})
         flash('Comentário adicionado com sucesso!', 'success')
     else:
         flash('Erro ao adicionar comentário.', 'danger')
     
     return redirect(url_for('main.project_detail', id=id))
 
+@main_bp.route('/tag/<name>')
+def tag_projects(name):
+    tag = Tag.query.filter_by(slug=name.strip().lower()).first_or_404()
+    query = (tag.projects.options(selectinload(Project.tag_list))
+             .filter(Project.status == 'published'))
+    try:
+        projects, next_cursor = keyset_page(query, Project.criado_em, Project.id,
+                                            request.args.get('cursor'), per_page=12)
+    except ValueError:
+        abort(400)
+    
+    top_tags = Tag.query.filter(Tag.projects_count > 0).order_by(desc(Tag.projects_count)).limit(20).all()
+    return render_template('tag.html', tag=tag, projects=projects, next_cursor=next_cursor, top_tags=top_tags)
+
+@main_bp.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    page = max(page, 1)
+    per_page = 10
+    
+    results, total = search_index.search(query, page, per_page) if query else ([], 0)
+    has_next = page * per_page < total
+    return render_template('search.html', query=query, results=results, total=total,
+                           page=page, has_next=has_next)
+
 @main_bp.route('/about')
 def about():
     # Get admin user info and achievements
     admin = User.query.filter_by(is_admin=True).first()
+    
+    # Validators from the admin profile and an aggregate over the achievements
+    achievements_count, last_modified = (0, None)
+    if admin:
+        achievements_count, last_modified = db.session.query(
+            func.count(Achievement.id), func.max(Achievement.atualizado_em)
+        ).filter_by(user_id=admin.id).one()
+    profile = (admin.id, admin.nome, admin.email, admin.foto_url) if admin else None
+    etag = make_etag(profile, achievements_count, last_modified)
+    
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+    
     if admin:
         achievements = Achievement.query.filter_by(user_id=admin.id).order_by(desc(Achievement.data)).all()
     else:
         achievements = []
     
-    return render_template('about.html', admin=admin, achievements=achievements)
+    response = make_response(render_template('about.html', admin=admin, achievements=achievements))
+    return add_cache_headers(response, etag, last_modified)
+
+# JSON API
+API_SORTS = {
+    'recent': (Project.criado_em, datetime),
+    'popular': (Project.likes_count, int),
+}
+
+def _api_thumb(row):
+    path = (row.imagem_variants or {}).get('thumb') or row.imagem_url
+    return url_for('static', filename=path) if path else None
+
+def _api_resumo(row):
+    return row.resumo[:100] + ('...' if len(row.resumo) > 100 else '')
+
+# Field name -> (columns it reads, serializer of the selected row)
+API_FIELDS = {
+    'id': ((Project.id,), lambda row: row.id),
+    'titulo': ((Project.titulo,), lambda row: row.titulo),
+    'descricao': ((Project.descricao,), lambda row: row.descricao),
+    # One character past the cut tells whether the card needs an ellipsis
+    'resumo': ((func.substr(Project.descricao, 1, 101).label('resumo'),), _api_resumo),
+    'tags': ((Project.tags,), lambda row: [{'nome': nome, 'slug': slug} for slug, nome in parse_tags(row.tags)]),
+    'status': ((Project.status,), lambda row: row.status),
+    'likes_count': ((Project.likes_count,), lambda row: row.likes_count),
+    'criado_em': ((Project.criado_em,), lambda row: row.criado_em.isoformat()),
+    'thumb': ((Project.imagem_url, Project.imagem_variants), _api_thumb),
+    'url': ((), lambda row: url_for('main.project_detail', id=row.id)),
+}
+API_DEFAULT_FIELDS = ('id', 'titulo', 'resumo', 'tags', 'status', 'likes_count', 'criado_em', 'thumb', 'url')
+API_MAX_LIMIT = 100
+
+@main_bp.route('/api/projects')
+def api_projects():
+    """Keyset-paginated project list, streamed as JSON"""
+    sort = request.args.get('sort', 'recent')
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(API_DEFAULT_FIELDS)
+    limit = request.args.get('limit', 20, type=int)
+    status = request.args.get('status', 'published')
+    if sort not in API_SORTS or not fields or any(f not in API_FIELDS for f in fields) \
+            or not 1 <= limit <= API_MAX_LIMIT or status not in ('published', 'draft', 'all'):
+        abort(400)
+    if status != 'published':
+        user = get_current_user()
+        if not user or not user.is_admin:
+            abort(403)
+    
+    sort_column, sort_type = API_SORTS[sort]
+    # Only the columns behind the requested fields, plus the keyset
+    columns = {Project.id: None, sort_column: None}
+    for field in fields:
+        columns.update(dict.fromkeys(API_FIELDS[field][0]))
+    stmt = select(*columns)
+    if status != 'all':
+        stmt = stmt.where(Project.status == status)
+    try:
+        stmt = keyset_order(stmt, sort_column, Project.id, request.args.get('cursor'), sort_type)
+    except ValueError:
+        abort(400)
+    rows = db.session.execute(stmt.limit(limit + 1))
+    serializers = [(field, API_FIELDS[field][1]) for field in fields]
+    
+    def generate():
+        yield '{"projects": ['
+        next_cursor = None
+        previous = None
+        for i, row in enumerate(rows):
+            if i == limit:
+                # The extra row only says there is another page
+                next_cursor = encode_cursor(getattr(previous, sort_column.key), previous.id)
+                break
+            item = {field: serialize(row) for field, serialize in serializers}
+            yield (',' if i else '') + json.dumps(item, ensure_ascii=False)
+            previous = row
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 # Admin Routes
 @main_bp.route('/admin')
 @admin_required
 def admin_dashboard():
-    projects_count = Project.query.count()
-    comments_count = Comment.query.count()
-    likes_count = Like.query.count()
-    unread_notifications = Notification.query.filter_by(lida=False).count()
+    # Materialized counters: one primary-key read instead of four COUNT(*) scans
+    stats = counters.get_counters()
     
     return render_template('admin/dashboard.html', 
-                         projects_count=projects_count,
-                         comments_count=comments_count,
-                         likes_count=likes_count,
-                         unread_notifications=unread_notifications)
+                         projects_count=stats['projects'],
+                         comments_count=stats['comments'],
+                         likes_count=stats['likes'],
+                         unread_notifications=stats['unread_notifications'])
+
+@main_bp.route('/admin/export')
+@admin_required
+def admin_export():
+    """Download the whole dataset, streamed straight from the database cursor
+
+    Password hashes are never offered over HTTP; export-data --with-password-hashes
+    is the only way to include them.
+    """
+    from backup import iter_archive, iter_ndjson
+    with_uploads = request.args.get('uploads') == '1'
+    extension, mimetype = ('tar', 'application/x-tar') if with_uploads else ('ndjson', 'application/x-ndjson')
+    filename = f"portfolio-{datetime.utcnow():%Y%m%d-%H%M%S}.{extension}"
+    chunks = iter_archive() if with_uploads else iter_ndjson()
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}',
+                             'X-Accel-Buffering': 'no'})
+
+@main_bp.route('/admin/stats')
+@admin_required
+def admin_stats():
+    return jsonify(counters.get_counters())
+
+@main_bp.route('/admin/events')
+@admin_required
+def admin_events():
+    """Server-Sent Events stream of likes and comments for live dashboards"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    try:
+        subscription = broker.subscribe(int(last_event_id) if last_event_id else None)
+    except ValueError:
+        abort(400)
+    except TooManySubscribers:
+        return Response('Muitas conexões abertas.', status=503, headers={'Retry-After': '30'})
+    
+    return Response(broker.stream(subscription), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+ADMIN_PROJECTS_PER_PAGE = 50
 
 @main_bp.route('/admin/projects')
 @admin_required
 def admin_projects():
-    projects = Project.query.order_by(desc(Project.criado_em)).all()
-    return render_template('admin/projects.html', projects=projects)
+    # Further pages come from /api/projects as the list is scrolled
+    try:
+        projects, next_cursor = keyset_page(Project.query, Project.criado_em, Project.id,
+                                            request.args.get('cursor'), per_page=ADMIN_PROJECTS_PER_PAGE)
+    except ValueError:
+        abort(400)
+    return render_template('admin/projects.html', projects=projects, next_cursor=next_cursor,
+                           per_page=ADMIN_PROJECTS_PER_PAGE)
 
 @main_bp.route('/admin/projects/new', methods=['GET', 'POST'])
 @admin_required
@@ -267,10 +547,15 @@ def admin_project_new():
             user_id=session['user_id']
         )
         db.session.add(project)
+        refresh_tag_counts(sync_project_tags(project))
+        search_index.index_project(project)
+        counters.bump('projects', 1)
         db.session.commit()
+        invalidate_home_cache(project.status)
+        image_pipeline.schedule('project', project.id, project.imagem_url)
         
         flash('Projeto criado com sucesso!', 'success')
-        return redirect(url_for('admin_projects'))
+        return redirect(url_for('main.admin_projects'))
     
     return render_template('admin/project_form.html', form=form, title='Novo Projeto')
 
@@ -281,6 +566,7 @@ def admin_project_edit(id):
     form = ProjectForm(obj=project)
     
     if form.validate_on_submit():
+        previous_status = project.status
         project.titulo = form.titulo.data
         project.descricao = form.descricao.data
         project.tags = form.tags.data
@@ -288,14 +574,20 @@ def admin_project_edit(id):
         project.atualizado_em = datetime.utcnow()
         
         # Update image if new one uploaded
+        new_image = None
         if form.imagem.data:
-            imagem_url = save_uploaded_file(form.imagem.data)
-            if imagem_url:
-                project.imagem_url = imagem_url
+            new_image = save_uploaded_file(form.imagem.data)
+            if new_image:
+                project.imagem_url = new_image
+                project.imagem_variants = None
         
+        refresh_tag_counts(sync_project_tags(project))
+        search_index.index_project(project)
         db.session.commit()
+        invalidate_home_cache(previous_status, project.status)
+        image_pipeline.schedule('project', project.id, new_image)
         flash('Projeto atualizado com sucesso!', 'success')
-        return redirect(url_for('admin_projects'))
+        return redirect(url_for('main.admin_projects'))
     
     return render_template('admin/project_form.html', form=form, project=project, title='Editar Projeto')
 
@@ -303,10 +595,20 @@ def admin_project_edit(id):
 @admin_required
 def admin_project_delete(id):
     project = Project.query.get_or_404(id)
+    status = project.status
+    tag_ids = [tag.id for tag in project.tag_list]
+    # The cascade loads these collections anyway to delete them
+    counters.bump('comments', -len(project.comments))
+    counters.bump('likes', -len(project.likes))
+    counters.bump('projects', -1)
     db.session.delete(project)
+    db.session.flush()
+    refresh_tag_counts(tag_ids)
+    search_index.remove_project(id)
     db.session.commit()
+    invalidate_home_cache(status)
     flash('Projeto excluído com sucesso!', 'success')
-    return redirect(url_for('admin_projects'))
+    return redirect(url_for('main.admin_projects'))
 
 @main_bp.route('/admin/achievements')
 @admin_required
@@ -337,10 +639,13 @@ def admin_achievement_new():
             user_id=session['user_id']
         )
         db.session.add(achievement)
+        db.session.flush()
+        search_index.index_achievement(achievement)
         db.session.commit()
+        image_pipeline.schedule('achievement', achievement.id, achievement.imagem_url)
         
         flash('Conquista criada com sucesso!', 'success')
-        return redirect(url_for('admin_achievements'))
+        return redirect(url_for('main.admin_achievements'))
     
     return render_template('admin/achievement_form.html', form=form, title='Nova Conquista')
 
@@ -366,14 +671,18 @@ def admin_achievement_edit(id):
         achievement.data = data
         
         # Update image if new one uploaded
+        new_image = None
         if form.imagem.data:
-            imagem_url = save_uploaded_file(form.imagem.data)
-            if imagem_url:
-                achievement.imagem_url = imagem_url
+            new_image = save_uploaded_file(form.imagem.data)
+            if new_image:
+                achievement.imagem_url = new_image
+                achievement.imagem_variants = None
         
+        search_index.index_achievement(achievement)
         db.session.commit()
+        image_pipeline.schedule('achievement', achievement.id, new_image)
         flash('Conquista atualizada com sucesso!', 'success')
-        return redirect(url_for('admin_achievements'))
+        return redirect(url_for('main.admin_achievements'))
     
     return render_template('admin/achievement_form.html', form=form, achievement=achievement, title='Editar Conquista')
 
@@ -382,19 +691,29 @@ def admin_achievement_edit(id):
 def admin_achievement_delete(id):
     achievement = Achievement.query.get_or_404(id)
     db.session.delete(achievement)
+    search_index.remove_achievement(id)
     db.session.commit()
     flash('Conquista excluída com sucesso!', 'success')
-    return redirect(url_for('admin_achievements'))
+    return redirect(url_for('main.admin_achievements'))
 
 @main_bp.route('/admin/notifications')
 @admin_required
 def admin_notifications():
-    notifications = Notification.query.filter_by(user_id=session['user_id']).order_by(desc(Notification.criado_em)).all()
+    query = Notification.query.filter_by(user_id=session['user_id'])
+    try:
+        notifications, next_cursor = keyset_page(query, Notification.criado_em, Notification.id,
+                                                 request.args.get('cursor'), per_page=30)
+    except ValueError:
+        abort(400)
+    response = render_template('admin/notifications.html', notifications=notifications,
+                               next_cursor=next_cursor)
     
-    # Mark all as read
-    for notification in notifications:
-        if not notification.lida:
-            notification.lida = True
-    db.session.commit()
+    # Opening the inbox marks everything as read in one UPDATE (after rendering,
+    # so the commit doesn't expire the rows the template reads)
+    if not request.args.get('cursor'):
+        marked = mark_all_read(session['user_id'])
+        db.session.commit()
+        if marked:
+            publish_unread_notifications()
     
-    return render_template('admin/notifications.html', notifications=notifications)
\ No newline at end of file
+    return response
\ No newline at end of file
@@ -0,0 +1,129 @@
+from datetime import datetime
+from functools import partial
+from sqlalchemy import JSON, DateTime, exists, inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from extensions import db
+from models import OutgoingEmail, Project, SchemaMigration, TrendingProject, TrendingState, project_tag
+
+
+def _add_column(conn, table_name, column_name, column_type):
+    """ALTER TABLE ... ADD COLUMN unless db.create_all() already built the column"""
+    if column_name in {column['name'] for column in inspect(conn).get_columns(table_name)}:
+        return
+    quote = conn.dialect.identifier_preparer.quote
+    conn.execute(text(f'ALTER TABLE {quote(table_name)} '
+                      f'ADD COLUMN {quote(column_name)} {column_type.compile(dialect=conn.dialect)}'))
+
+
+def _add_image_columns(conn):
+    """Columns added before migrations were versioned"""
+    _add_column(conn, 'project', 'imagem_variants', JSON())
+    _add_column(conn, 'achievement', 'imagem_variants', JSON())
+    _add_column(conn, 'achievement', 'atualizado_em', DateTime())
+
+
+def _create_indexes(*names, conn):
+    """Create the named model indexes unless they already exist"""
+    indexes = {index.name: index for table in db.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+def _create_trending(conn):
+    """Like timestamps, activity indexes and the precomputed trending table"""
+    _add_column(conn, 'like', 'criado_em', DateTime())
+    TrendingProject.__table__.create(conn, checkfirst=True)
+    _create_indexes('ix_like_criado_em', 'ix_comment_criado_em', conn=conn)
+
+
+def _create_outbox(conn):
+    OutgoingEmail.__table__.create(conn, checkfirst=True)
+
+
+def _create_trending_state(conn):
+    """The row trending.py claims refreshes on"""
+    TrendingState.__table__.create(conn, checkfirst=True)
+    if conn.scalar(select(TrendingState.id).where(TrendingState.id == 1)) is None:
+        conn.execute(db.insert(TrendingState).values(id=1, calculado_em=None))
+
+
+def _backfill_tags(conn):
+    """Tag rows and links for projects saved before tags had their own table"""
+    from tags import link_new_projects
+    untagged = select(Project.id, Project.tags).where(
+        Project.tags.isnot(None), Project.tags != '',
+        ~exists().where(project_tag.c.project_id == Project.id))
+    link_new_projects(conn.execute(untagged).all(), conn=conn)
+
+
+def _fill_search_index(conn):
+    """Populate a search index that an earlier init_db created empty
+
+    Databases without the table get it, already filled, from ensure_search_index.
+    """
+    from search import fill_search_index, search_table_exists
+    if conn.dialect.name == 'sqlite' and search_table_exists(conn):
+        fill_search_index(conn)
+
+
+# (version, description, step). Steps must be safe to re-run, since db.create_all()
+# may already have built the objects they add on a fresh database.
+MIGRATIONS = [
+    (1, 'Columns added since the original schema', _add_image_columns),
+    (2, 'Comment and notification pagination indexes',
+     partial(_create_indexes, 'ix_comment_project_criado_em',
+             'ix_notification_user_lida_criado_em', 'ix_notification_user_criado_em')),
+    (3, 'Indexes for listings and user lookups',
+     partial(_create_indexes, 'ix_project_status_criado_em', 'ix_project_status_likes_count',
+             'ix_project_criado_em', 'ix_achievement_user_data', 'ix_user_reset_token',
+             'ix_user_is_admin')),
+    (4, 'Trending ranking', _create_trending),
+    (5, 'Outgoing email queue', _create_outbox),
+    (6, 'Tags from the legacy comma-separated column', _backfill_tags),
+    (7, 'Search index contents', _fill_search_index),
+    (8, 'Trending refresh claim row', _create_trending_state),
+]
+
+
+def current_version():
+    with db.engine.connect() as conn:
+        return conn.scalar(select(db.func.max(SchemaMigration.version))) or 0
+
+
+def schema_is_current():
+    """Whether init_db already brought this database to the latest migration"""
+    try:
+        return current_version() >= MIGRATIONS[-1][0]
+    except (OperationalError, ProgrammingError):
+        # No schema_migration table yet
+        return False
+
+
+def init_db():
+    """Create missing tables, apply migrations and seed derived data; safe to re-run"""
+    db.create_all()
+    migrate()
+
+    from search import ensure_search_index
+    ensure_search_index()
+
+    from counters import ensure_counters
+    ensure_counters()
+
+
+def migrate():
+    """Apply pending migrations in order, each in its own transaction; returns the versions applied"""
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    with db.engine.connect() as conn:
+        applied = set(conn.scalars(select(SchemaMigration.version)))
+
+    done = []
+    for version, descricao, step in MIGRATIONS:
+        if version in applied:
+            continue
+        with db.engine.begin() as conn:
+            step(conn=conn)
+            conn.execute(db.insert(SchemaMigration).values(
+                version=version, descricao=descricao, aplicado_em=datetime.utcnow()))
+        done.append(version)
+    return done
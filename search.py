@@ -0,0 +1,185 @@
+import logging
+import re
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from extensions import db
+from models import Project, Achievement
+
+logger = logging.getLogger(__name__)
+
+# Each document gets a fixed rowid so updates and deletes never scan the index
+KIND_PROJECT = 0
+KIND_ACHIEVEMENT = 1
+
+SEARCH_TABLE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    titulo, descricao, tags,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+# bm25 column weights: titulo, descricao, tags
+RANK_SQL = 'bm25(search_index, 10.0, 1.0, 5.0)'
+
+_fts_enabled = None
+
+
+def fts_enabled():
+    """Whether the FTS5 index is available on the current database"""
+    global _fts_enabled
+    if _fts_enabled is None:
+        # Workers that skipped init_db find out once, on first use
+        _fts_enabled = db.engine.dialect.name == 'sqlite' and search_table_exists(db.session)
+    return _fts_enabled
+
+
+def search_table_exists(conn):
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+    ).first() is not None
+
+
+def ensure_search_index():
+    """Create the FTS5 table if the database supports it, filling it when it is new"""
+    global _fts_enabled
+    if db.engine.dialect.name != 'sqlite':
+        _fts_enabled = False
+        return
+    try:
+        with db.engine.begin() as conn:
+            created = not search_table_exists(conn)
+            conn.execute(text(SEARCH_TABLE_SQL))
+            if created:
+                fill_search_index(conn)
+        _fts_enabled = True
+    except OperationalError:
+        logger.warning('SQLite sem suporte a FTS5; a busca usará LIKE.')
+        _fts_enabled = False
+
+
+def _rowid(kind, ref_id):
+    return ref_id * 2 + kind
+
+
+def _upsert(kind, ref_id, titulo, descricao, tags):
+    rowid = _rowid(kind, ref_id)
+    db.session.execute(text('DELETE FROM search_index WHERE rowid = :rowid'), {'rowid': rowid})
+    db.session.execute(
+        text('INSERT INTO search_index (rowid, titulo, descricao, tags) VALUES (:rowid, :titulo, :descricao, :tags)'),
+        {'rowid': rowid, 'titulo': titulo, 'descricao': descricao, 'tags': tags or ''},
+    )
+
+
+def _remove(kind, ref_id):
+    db.session.execute(text('DELETE FROM search_index WHERE rowid = :rowid'), {'rowid': _rowid(kind, ref_id)})
+
+
+def index_project(project):
+    """Add, refresh or drop a project in the index; only published projects are searchable"""
+    if not fts_enabled():
+        return
+    if project.status == 'published':
+        _upsert(KIND_PROJECT, project.id, project.titulo, project.descricao, project.tags)
+    else:
+        _remove(KIND_PROJECT, project.id)
+
+
+def remove_project(project_id):
+    if fts_enabled():
+        _remove(KIND_PROJECT, project_id)
+
+
+def index_achievement(achievement):
+    if fts_enabled():
+        _upsert(KIND_ACHIEVEMENT, achievement.id, achievement.titulo, achievement.descricao, None)
+
+
+def remove_achievement(achievement_id):
+    if fts_enabled():
+        _remove(KIND_ACHIEVEMENT, achievement_id)
+
+
+def fill_search_index(conn):
+    """Replace the index contents with every searchable row, on conn (a connection or the session)"""
+    conn.execute(text('DELETE FROM search_index'))
+    conn.execute(text(
+        "INSERT INTO search_index (rowid, titulo, descricao, tags) "
+        "SELECT id * 2 + :kind, titulo, descricao, coalesce(tags, '') FROM project WHERE status = 'published'"
+    ), {'kind': KIND_PROJECT})
+    conn.execute(text(
+        "INSERT INTO search_index (rowid, titulo, descricao, tags) "
+        "SELECT id * 2 + :kind, titulo, descricao, '' FROM achievement"
+    ), {'kind': KIND_ACHIEVEMENT})
+    conn.execute(text("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+
+
+def rebuild_search_index():
+    """Drop and repopulate the whole index from the source tables"""
+    ensure_search_index()
+    if not fts_enabled():
+        return 0
+    fill_search_index(db.session)
+    db.session.commit()
+    return db.session.execute(text('SELECT count(*) FROM search_index')).scalar()
+
+
+def build_match_query(raw):
+    """Turn free text into a safe FTS5 query: every word must match, last word as a prefix"""
+    words = re.findall(r'\w+', raw or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return ' '.join(terms)
+
+
+def search(raw, page=1, per_page=10):
+    """Ranked search over projects and achievements
+
+    Returns (results, total) where results is a list of ('project'|'achievement', obj).
+    """
+    if not fts_enabled():
+        return _search_like(raw, page, per_page)
+
+    match = build_match_query(raw)
+    if match is None:
+        return [], 0
+
+    total = db.session.execute(
+        text('SELECT count(*) FROM search_index WHERE search_index MATCH :q'), {'q': match}
+    ).scalar()
+    rows = db.session.execute(
+        text(f'SELECT rowid FROM search_index WHERE search_index MATCH :q ORDER BY {RANK_SQL} LIMIT :limit OFFSET :offset'),
+        {'q': match, 'limit': per_page, 'offset': (page - 1) * per_page},
+    ).scalars().all()
+    return _load_documents([(rowid % 2, rowid // 2) for rowid in rows]), total
+
+
+def _load_documents(keys):
+    """Fetch the ranked documents with one query per kind, preserving rank order"""
+    project_ids = [ref_id for kind, ref_id in keys if kind == KIND_PROJECT]
+    achievement_ids = [ref_id for kind, ref_id in keys if kind == KIND_ACHIEVEMENT]
+    projects = {p.id: p for p in Project.query.filter(Project.id.in_(project_ids))} if project_ids else {}
+    achievements = {a.id: a for a in Achievement.query.filter(Achievement.id.in_(achievement_ids))} if achievement_ids else {}
+
+    results = []
+    for kind, ref_id in keys:
+        if kind == KIND_PROJECT and ref_id in projects:
+            results.append(('project', projects[ref_id]))
+        elif kind == KIND_ACHIEVEMENT and ref_id in achievements:
+            results.append(('achievement', achievements[ref_id]))
+    return results
+
+
+def _search_like(raw, page, per_page):
+    """Fallback for databases without FTS5 (projects only, unranked)"""
+    words = re.findall(r'\w+', raw or '')
+    if not words:
+        return [], 0
+    query = Project.query.filter_by(status='published')
+    for word in words:
+        pattern = f'%{word}%'
+        query = query.filter(db.or_(Project.titulo.ilike(pattern), Project.descricao.ilike(pattern),
+                                    Project.tags.ilike(pattern)))
+    total = query.count()
+    projects = query.order_by(Project.criado_em.desc()).offset((page - 1) * per_page).limit(per_page).all()
+    return [('project', project) for project in projects], total
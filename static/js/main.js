@@ -16,6 +16,8 @@ function initializeApp() {
     setupNavbarHighlight();
     setupAnimations();
     setupFormValidation();
+    setupLiveCounters();
+    setupProjectFeeds();
     
     console.log('Portfolio website initialized successfully');
 }
@@ -117,6 +119,178 @@ function setupAnimations() {
     });
 }
 
+/**
+ * Update dashboard counters from the Server-Sent Events stream
+ */
+function setupLiveCounters() {
+    const container = document.querySelector('[data-live-events]');
+    
+    if (!container || !window.EventSource) return;
+    
+    function bump(name, delta) {
+        const counter = container.querySelector(`[data-counter="${name}"]`);
+        if (!counter) return;
+        
+        const value = parseInt(counter.textContent, 10) || 0;
+        counter.textContent = Math.max(0, value + delta);
+    }
+    
+    function show(name, value) {
+        const counter = container.querySelector(`[data-counter="${name}"]`);
+        if (counter) counter.textContent = value;
+    }
+    
+    // EventSource reconnects on its own and resends Last-Event-ID
+    const source = new EventSource(container.dataset.liveEvents);
+    
+    source.addEventListener('like', function(e) {
+        const data = JSON.parse(e.data);
+        bump('likes', data.liked ? 1 : -1);
+    });
+    
+    source.addEventListener('comment', function(e) {
+        const data = JSON.parse(e.data);
+        bump('comments', 1);
+    });
+    
+    // Sent with the stored total: repeated events are folded into one notification
+    source.addEventListener('notifications', function(e) {
+        show('notifications', JSON.parse(e.data).unread);
+    });
+    
+    window.addEventListener('beforeunload', function() {
+        source.close();
+    });
+}
+
+/**
+ * Append further pages of projects from /api/projects to a list
+ *
+ * The container names the feed URL, the current cursor, a <template> for one
+ * project and a trigger element: a link that loads the next page on click
+ * (and works without JavaScript), or a sentinel that loads it when scrolled
+ * into view when the container has data-feed-scroll.
+ */
+function setupProjectFeeds() {
+    document.querySelectorAll('[data-project-feed]').forEach(container => {
+        const template = document.querySelector(container.dataset.feedTemplate);
+        const trigger = document.querySelector(container.dataset.feedTrigger);
+        let cursor = container.dataset.feedCursor;
+        let loading = false;
+        let observer = null;
+        
+        if (!template || !trigger || !cursor) return;
+        
+        function finish() {
+            if (observer) observer.disconnect();
+            trigger.remove();
+        }
+        
+        function loadMore() {
+            if (loading || !cursor) return;
+            loading = true;
+            
+            const url = new URL(container.dataset.feedUrl, window.location.origin);
+            url.searchParams.set('cursor', cursor);
+            
+            fetch(url, { headers: { 'Accept': 'application/json' } })
+                .then(response => {
+                    if (!response.ok) throw new Error(response.status);
+                    return response.json();
+                })
+                .then(data => {
+                    data.projects.forEach(project => {
+                        container.appendChild(renderProject(template, project));
+                    });
+                    cursor = data.next_cursor;
+                    if (!cursor) finish();
+                })
+                .catch(() => {
+                    showNotification('Não foi possível carregar mais projetos.', 'error');
+                    finish();
+                })
+                .finally(() => {
+                    loading = false;
+                });
+        }
+        
+        if ('feedScroll' in container.dataset && window.IntersectionObserver) {
+            observer = new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) loadMore();
+            }, { rootMargin: '300px' });
+            observer.observe(trigger);
+        } else {
+            trigger.addEventListener('click', function(e) {
+                e.preventDefault();
+                loadMore();
+            });
+        }
+    });
+}
+
+/**
+ * Fill a copy of a project <template> with one project from the API
+ */
+function renderProject(template, project) {
+    const node = template.content.firstElementChild.cloneNode(true);
+    
+    node.querySelectorAll('[data-field]').forEach(el => {
+        let value = project[el.dataset.field];
+        if (el.dataset.field === 'criado_em') {
+            value = new Date(value).toLocaleDateString('pt-BR');
+        } else if (el.dataset.field === 'tags') {
+            value = value.map(tag => tag.nome).join(', ');
+        }
+        
+        if (!value && value !== 0 && 'optional' in el.dataset) {
+            el.remove();
+        } else {
+            el.textContent = value;
+        }
+    });
+    
+    node.querySelectorAll('[data-field-src]').forEach(el => {
+        const value = project[el.dataset.fieldSrc];
+        if (value) {
+            el.src = value;
+            el.alt = project.titulo;
+        } else {
+            el.remove();
+        }
+    });
+    
+    node.querySelectorAll('[data-field-href]').forEach(el => {
+        el.href = project[el.dataset.fieldHref];
+    });
+    
+    // Routes with the project id, rendered server-side with an __ID__ placeholder
+    node.querySelectorAll('[data-id-attr]').forEach(el => {
+        const attr = el.dataset.idAttr;
+        el.setAttribute(attr, el.getAttribute(attr).replace('__ID__', project.id));
+    });
+    
+    node.querySelectorAll('[data-status]').forEach(el => {
+        if (el.dataset.status !== project.status) el.remove();
+    });
+    
+    node.querySelectorAll('[data-field-tags]').forEach(el => {
+        const tags = (project.tags || []).slice(0, 3);
+        if (!tags.length) {
+            el.remove();
+            return;
+        }
+        tags.forEach(tag => {
+            const badge = document.createElement('a');
+            badge.href = el.dataset.tagUrl.replace('__SLUG__', encodeURIComponent(tag.slug));
+            badge.className = 'badge bg-secondary me-1 text-decoration-none';
+            badge.textContent = tag.nome;
+            el.appendChild(badge);
+        });
+    });
+    
+    return node;
+}
+
 /**
  * Setup form validation and submission handling
  */
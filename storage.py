@@ -0,0 +1,135 @@
+import hashlib
+import os
+import tempfile
+import time
+
+CHUNK_SIZE = 64 * 1024
+
+
+class LocalStorage:
+    """Blob backend on a local directory
+
+    An object-storage backend only needs the same six methods: put_file,
+    exists, touch, delete, open (a binary file object) and iter_keys
+    (yielding (key, modified_timestamp)).
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.tmp_dir = os.path.join(root, '.tmp')
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def put_file(self, key, source_path):
+        """Move a finished temp file into place under key"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # mkstemp creates the file 0600; the web server has to be able to read it
+        os.chmod(source_path, 0o644)
+        os.replace(source_path, path)
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def touch(self, key):
+        """Mark key as just written, so collect_garbage's grace period starts over"""
+        os.utime(self._path(key))
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_keys(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                yield key, os.path.getmtime(path)
+
+
+class ContentAddressedStore:
+    """Stores uploads under the SHA-256 of their bytes, sharded as ab/cd/<hash>.<ext>
+
+    The hash is computed while the upload is streamed to a temp file in chunks,
+    so identical files are stored once and the upload is never held in memory.
+    """
+
+    def __init__(self, backend=None, url_prefix='uploads'):
+        self.backend = backend
+        self.url_prefix = url_prefix
+
+    def init_app(self, app):
+        self.backend = LocalStorage(app.config['UPLOAD_FOLDER'])
+        self.url_prefix = os.path.basename(os.path.normpath(app.config['UPLOAD_FOLDER']))
+
+    def save(self, file):
+        """Store a werkzeug FileStorage and return its path relative to the static folder"""
+        ext = os.path.splitext(file.filename or '')[1].lower()
+        os.makedirs(self.backend.tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.backend.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+            return self._put(tmp_path, digest.hexdigest(), ext)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def save_temp(self, tmp_path, ext):
+        """Store a finished file from backend.tmp_dir (moved, not copied); returns its path like save"""
+        digest = hashlib.sha256()
+        try:
+            with open(tmp_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            return self._put(tmp_path, digest.hexdigest(), ext)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _put(self, tmp_path, hexdigest, ext):
+        # A stored key is never written again: its bytes are what the name says
+        key = f'{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{ext}'
+        if self.backend.exists(key):
+            os.remove(tmp_path)
+            # The file may be unreferenced and old; the row about to point at it is not committed yet
+            self.backend.touch(key)
+        else:
+            self.backend.put_file(key, tmp_path)
+        return f'{self.url_prefix}/{key}'
+
+    def key_for(self, imagem_url):
+        prefix = self.url_prefix + '/'
+        return imagem_url[len(prefix):] if imagem_url and imagem_url.startswith(prefix) else None
+
+    def collect_garbage(self, referenced_urls, grace_seconds=3600, dry_run=False):
+        """Delete stored files not in referenced_urls; returns the deleted keys
+
+        Files newer than grace_seconds are kept so uploads whose row has not
+        been committed yet are not collected.
+        """
+        referenced = {self.key_for(url) for url in referenced_urls} - {None}
+        cutoff = time.time() - grace_seconds
+        deleted = []
+        for key, modified in list(self.backend.iter_keys()):
+            if key not in referenced and modified < cutoff:
+                if not dry_run:
+                    self.backend.delete(key)
+                deleted.append(key)
+        return deleted
+
+
+upload_store = ContentAddressedStore()
@@ -0,0 +1,102 @@
+from sqlalchemy import func, select
+from extensions import db
+from models import Project, Tag, project_tag
+
+
+def parse_tags(raw):
+    """Split a comma-separated tag string into unique (slug, nome) pairs, keeping input order"""
+    seen = {}
+    for nome in (raw or '').split(','):
+        nome = nome.strip()[:50]
+        slug = nome.lower()
+        if slug and slug not in seen:
+            seen[slug] = nome
+    return list(seen.items())
+
+
+def sync_project_tags(project):
+    """Point project.tag_list at the Tag rows for project.tags, creating missing ones
+
+    Returns the ids of every tag whose count may have changed, for refresh_tag_counts.
+    """
+    pairs = parse_tags(project.tags)
+    slugs = [slug for slug, _ in pairs]
+    existing = {tag.slug: tag for tag in Tag.query.filter(Tag.slug.in_(slugs))} if slugs else {}
+
+    tags = []
+    for slug, nome in pairs:
+        tag = existing.get(slug)
+        if tag is None:
+            tag = Tag(nome=nome, slug=slug, projects_count=0)
+            db.session.add(tag)
+        tags.append(tag)
+
+    affected = {tag.id for tag in project.tag_list}
+    project.tag_list = tags
+    db.session.flush()
+    return affected | {tag.id for tag in tags}
+
+
+def refresh_tag_counts(tag_ids=None, conn=None):
+    """Recompute the precomputed published-project count for the given tags (all when None)
+
+    Runs on conn when given (a migration), otherwise in the session.
+    """
+    published_count = (
+        select(func.count())
+        .select_from(project_tag.join(Project, Project.id == project_tag.c.project_id))
+        .where(project_tag.c.tag_id == Tag.id, Project.status == 'published')
+        .scalar_subquery()
+    )
+    update = db.update(Tag).values(projects_count=published_count)
+    if tag_ids is not None:
+        if not tag_ids:
+            return
+        update = update.where(Tag.id.in_(tag_ids))
+    (db.session if conn is None else conn).execute(update)
+
+
+def link_new_projects(project_tags, batch_size=500, conn=None):
+    """sync_project_tags in bulk for projects inserted without tag links
+
+    project_tags is a list of (project_id, tags string) pairs. Runs on conn
+    when given (a migration), otherwise in the session.
+    """
+    executor = db.session if conn is None else conn
+    wanted = {}
+    for _, raw in project_tags:
+        for slug, nome in parse_tags(raw):
+            wanted.setdefault(slug, nome)
+
+    slugs = list(wanted)
+    tag_ids = {}
+    for start in range(0, len(slugs), batch_size):
+        chunk = slugs[start:start + batch_size]
+        tag_ids.update(executor.execute(select(Tag.slug, Tag.id).where(Tag.slug.in_(chunk))).all())
+    missing = [{'nome': wanted[slug], 'slug': slug, 'projects_count': 0} for slug in slugs if slug not in tag_ids]
+    if missing:
+        new_ids = executor.scalars(db.insert(Tag).returning(Tag.id, sort_by_parameter_order=True), missing).all()
+        tag_ids.update(zip((row['slug'] for row in missing), new_ids))
+
+    links = [{'project_id': project_id, 'tag_id': tag_ids[slug]}
+             for project_id, raw in project_tags for slug, _ in parse_tags(raw)]
+    if links:
+        executor.execute(project_tag.insert(), links)
+    refresh_tag_counts({link['tag_id'] for link in links}, conn=conn)
+
+
+def backfill_tags(batch_size=500):
+    """Build the tag table and associations from the legacy comma-separated column"""
+    last_id = 0
+    while True:
+        projects = (Project.query.filter(Project.id > last_id)
+                    .order_by(Project.id).limit(batch_size).all())
+        if not projects:
+            break
+        for project in projects:
+            sync_project_tags(project)
+        db.session.commit()
+        last_id = projects[-1].id
+
+    refresh_tag_counts()
+    db.session.commit()
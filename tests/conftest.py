@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app on a fresh SQLite file (create_app runs init_db on it), inside an app context"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        yield app
+        db.session.remove()
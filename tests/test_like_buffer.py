@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import select
+import likes
+from extensions import db
+from likes import LikeBuffer
+from models import Like, Project, User
+
+
+@pytest.fixture
+def buffer(app):
+    # A long interval keeps the background thread from flushing behind the test's back
+    app.config['LIKE_BUFFER_INTERVAL'] = 3600
+    buffer = LikeBuffer()
+    buffer.init_app(app)
+    return buffer
+
+
+@pytest.fixture
+def user_and_projects(app):
+    user = User(nome='Leitor', email='leitor@example.com', senha_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    projects = [Project(titulo=f'Projeto {i}', descricao='-', status='published', user_id=user.id)
+                for i in range(3)]
+    db.session.add_all(projects)
+    db.session.commit()
+    return user.id, [project.id for project in projects]
+
+
+def stored_likes(user_id):
+    return set(db.session.scalars(select(Like.project_id).where(Like.user_id == user_id)))
+
+
+def likes_count(project_id):
+    return db.session.scalar(select(Project.likes_count).where(Project.id == project_id))
+
+
+def test_failed_flush_keeps_batch_and_newer_toggles(buffer, user_and_projects, monkeypatch):
+    user_id, (first, second, _) = user_and_projects
+    assert buffer.toggle(user_id, first, 0) == (True, 1)
+    assert buffer.toggle(user_id, second, 0) == (True, 1)
+
+    bump = likes._bump_likes_count
+
+    def fail_after_a_toggle(project_id, delta):
+        # The user unlikes the second project while its like is being written
+        monkeypatch.setattr(likes, '_bump_likes_count', bump)
+        assert buffer.toggle(user_id, second, 0)[0] is False
+        raise RuntimeError('database away')
+
+    monkeypatch.setattr(likes, '_bump_likes_count', fail_after_a_toggle)
+    assert buffer.flush() is False
+    assert stored_likes(user_id) == set()
+    assert buffer.pending_state(user_id, first) is True
+    assert buffer.pending_state(user_id, second) is False
+
+    assert buffer.flush() is True
+    db.session.expire_all()
+    assert stored_likes(user_id) == {first}
+    assert (likes_count(first), likes_count(second)) == (1, 0)
+    assert buffer.pending_state(user_id, first) is None
+
+
+def test_flush_skips_deleted_projects(buffer, user_and_projects):
+    user_id, (first, _, deleted) = user_and_projects
+    buffer.toggle(user_id, first, 0)
+    buffer.toggle(user_id, deleted, 0)
+    db.session.execute(db.delete(Project).where(Project.id == deleted))
+    db.session.commit()
+
+    assert buffer.flush() is True
+    assert stored_likes(user_id) == {first}
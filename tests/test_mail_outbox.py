@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from extensions import db
+from mail import mail_outbox
+from models import OutgoingEmail
+
+
+def enqueue(count):
+    for i in range(count):
+        mail_outbox.enqueue(f'destino{i}@example.com', 'Assunto', 'Corpo')
+    db.session.commit()
+
+
+def test_claim_reserves_each_email_once(app):
+    app.config['MAIL_BATCH_SIZE'] = 2
+    enqueue(3)
+
+    first, second = mail_outbox._claim(), mail_outbox._claim()
+    assert len(first) == 2 and len(second) == 1
+    assert not {email.id for email in first} & {email.id for email in second}
+    assert first[0].reservado_por and first[0].reservado_por != second[0].reservado_por
+    assert mail_outbox._claim() == []
+
+
+def test_send_pending_sends_every_email_once(app, capsys):
+    app.config['MAIL_BATCH_SIZE'] = 2
+    enqueue(3)
+
+    assert mail_outbox.send_pending() == (3, 0)
+    assert mail_outbox.send_pending() == (0, 0)
+    assert capsys.readouterr().out.count('Assunto: Assunto') == 3
+    assert set(db.session.scalars(select(OutgoingEmail.status))) == {'sent'}
+
+
+def test_purge_removes_only_old_finished_emails(app):
+    app.config['MAIL_RETENTION_DAYS'] = 30
+    enqueue(3)
+    old = datetime.utcnow() - timedelta(days=31)
+    rows = db.session.scalars(select(OutgoingEmail).order_by(OutgoingEmail.id)).all()
+    rows[0].status, rows[0].proxima_tentativa = 'sent', old
+    rows[1].status, rows[1].proxima_tentativa = 'failed', old
+    rows[2].proxima_tentativa = old  # Still pending: kept however old
+    db.session.commit()
+
+    assert mail_outbox.purge() == 2
+    assert db.session.scalars(select(OutgoingEmail.status)).all() == ['pending']
@@ -0,0 +1,49 @@
+import pytest
+from pubsub import EventBroker, Subscription, TooManySubscribers
+
+
+def drain(subscription):
+    events = []
+    while (event := subscription.get(0)) is not None:
+        events.append(event)
+    return events
+
+
+def test_stalled_subscriber_drops_oldest_events():
+    broker = EventBroker()
+    subscription = Subscription(broker, [], maxsize=2)
+    for event in ('a', 'b', 'c'):
+        subscription.push(event)
+    assert drain(subscription) == ['b', 'c']
+
+
+def test_push_survives_a_publisher_refilling_the_slot(monkeypatch):
+    subscription = Subscription(EventBroker(), [], maxsize=1)
+    subscription.push('a')
+
+    # Another publisher fills the freed slot between the drop and the retry
+    get_nowait = subscription.queue.get_nowait
+
+    def get_then_refill():
+        event = get_nowait()
+        subscription.queue.put_nowait('other')
+        return event
+
+    monkeypatch.setattr(subscription.queue, 'get_nowait', get_then_refill)
+    subscription.push('b')
+    assert subscription.queue.qsize() == 1
+
+
+def test_subscribe_replays_after_last_event_id_and_caps_subscribers():
+    broker = EventBroker()
+    broker.max_subscribers = 1
+    for i in range(3):
+        broker.publish('like', {'n': i})
+
+    subscription = broker.subscribe(last_event_id=1)
+    assert [data['n'] for _, _, data in drain(subscription)] == [1, 2]
+    with pytest.raises(TooManySubscribers):
+        broker.subscribe()
+
+    subscription.close()
+    broker.subscribe().close()
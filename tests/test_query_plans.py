@@ -0,0 +1,12 @@
+from benchmarks.query_plans import find_full_scans
+
+
+def test_hot_queries_use_indexes(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'plans.db'}"
+    monkeypatch.setenv('DATABASE_URL', database_url)  # Restored after the test
+
+    checked, failures = find_full_scans(database_url)
+
+    assert checked
+    assert not failures, '\n'.join(f"SCAN {', '.join(scans)}: {' '.join(statement.split())}"
+                                   for statement, scans, _ in failures)
@@ -0,0 +1,43 @@
+import pytest
+import ratelimit
+from ratelimit import MemoryBucketStore, parse_rate
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_rate():
+    assert parse_rate('10/minute') == (10, 60.0)
+    with pytest.raises(ValueError):
+        parse_rate('0/minute')
+
+
+def test_bucket_allows_burst_then_refills_at_rate(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, 'monotonic', clock)
+    store = MemoryBucketStore()
+
+    assert [store.consume('ip:1', 1.0, 3) for _ in range(3)] == [0, 0, 0]
+    assert store.consume('ip:1', 1.0, 3) == pytest.approx(1.0)
+    assert store.consume('ip:2', 1.0, 3) == 0  # Buckets are per key
+
+    clock.now += 1.0
+    assert store.consume('ip:1', 1.0, 3) == 0
+    assert store.consume('ip:1', 1.0, 3) > 0
+
+
+def test_full_buckets_are_pruned(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, 'monotonic', clock)
+    store = MemoryBucketStore(max_keys=2)
+    store.consume('a', 1.0, 5)
+    store.consume('b', 1.0, 5)
+
+    clock.now += 10
+    store.consume('c', 1.0, 5)
+    assert set(store._full_at) == {'c'}
@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from extensions import db
+from models import Like, Project, TrendingProject, TrendingState, User
+from trending import trending_ranker
+
+
+def test_refresh_is_claimed_once_per_interval(app):
+    user = User(nome='Autor', email='autor@example.com', senha_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    project = Project(titulo='Projeto', descricao='-', status='published', user_id=user.id)
+    db.session.add(project)
+    db.session.flush()
+    db.session.add(Like(user_id=user.id, project_id=project.id))
+    db.session.commit()
+
+    assert trending_ranker.refresh() == 1
+    assert db.session.scalars(select(TrendingProject.project_id)).all() == [project.id]
+    # Another worker (or the next loop) finds the claim still fresh
+    assert trending_ranker.refresh() is None
+    assert trending_ranker.refresh(force=True) == 1
+
+    db.session.execute(db.update(TrendingState).values(
+        calculado_em=datetime.utcnow() - timedelta(seconds=trending_ranker.interval + 1)))
+    db.session.commit()
+    assert trending_ranker.refresh() == 1
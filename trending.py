@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from models import Comment, Like, Project, TrendingProject, TrendingState
+
+logger = logging.getLogger(__name__)
+
+
+def compute_scores(now, window_days, half_life_hours, comment_weight):
+    """Activity per published project, each like or comment decayed by its age
+
+    Events are grouped per project and day in SQL, so the work in Python is
+    bounded by projects x days in the window rather than by the event count.
+    """
+    cutoff = now - timedelta(days=window_days)
+    scores = defaultdict(float)
+    for model, weight in ((Like, 1.0), (Comment, comment_weight)):
+        dia = func.date(model.criado_em).label('dia')
+        rows = db.session.execute(
+            select(model.project_id, dia, func.count())
+            .join(Project, Project.id == model.project_id)
+            .where(model.criado_em >= cutoff, Project.status == 'published')
+            .group_by(model.project_id, dia))
+        for project_id, dia, total in rows:
+            if isinstance(dia, str):  # SQLite returns the date as text
+                dia = date.fromisoformat(dia)
+            # Events are taken to happen mid-day
+            age_hours = max((now - datetime.combine(dia, datetime.min.time())).total_seconds() / 3600 - 12, 0)
+            scores[project_id] += weight * total * 0.5 ** (age_hours / half_life_hours)
+    return scores
+
+
+class TrendingRanker:
+    """Keeps the TrendingProject table up to date from a background thread
+
+    Every worker runs the thread, but a refresh is first claimed with a
+    conditional UPDATE on the TrendingState row, so only the worker whose
+    UPDATE moved calculado_em forward recomputes the ranking.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._refresh_listeners = []
+
+    def init_app(self, app):
+        app.config.setdefault('TRENDING_ENABLED', True)
+        app.config.setdefault('TRENDING_INTERVAL', 300)  # seconds between recomputations
+        app.config.setdefault('TRENDING_HALF_LIFE_HOURS', 48)
+        app.config.setdefault('TRENDING_WINDOW_DAYS', 14)
+        app.config.setdefault('TRENDING_COMMENT_WEIGHT', 2.0)
+        app.config.setdefault('TRENDING_SIZE', 30)
+        self.app = app
+        self.interval = app.config['TRENDING_INTERVAL']
+        if app.config['TRENDING_ENABLED']:
+            # Started from the first request so it runs in the forked worker
+            app.before_request(self._ensure_worker)
+
+    def on_refresh(self, listener):
+        """Register listener() to run after the ranking is rewritten"""
+        self._refresh_listeners.append(listener)
+        return listener
+
+    def refresh(self, force=False):
+        """Recompute the ranking unless it is fresher than TRENDING_INTERVAL
+
+        Returns the number of ranked projects, or None when it was still fresh
+        or another worker claimed it. Runs in the caller's app context.
+        """
+        now = datetime.utcnow()
+        claim = db.update(TrendingState).where(TrendingState.id == 1).values(calculado_em=now)
+        if not force:
+            claim = claim.where(or_(TrendingState.calculado_em.is_(None),
+                                    TrendingState.calculado_em <= now - timedelta(seconds=self.interval)))
+        # Committed on its own so the write lock is not held while scores are computed;
+        # a failed computation is retried once the claim goes stale
+        claimed = db.session.execute(claim).rowcount
+        db.session.commit()
+        if not claimed and not force:
+            return None
+
+        config = self.app.config
+        scores = compute_scores(now, config['TRENDING_WINDOW_DAYS'], config['TRENDING_HALF_LIFE_HOURS'],
+                                config['TRENDING_COMMENT_WEIGHT'])
+        top = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:config['TRENDING_SIZE']]
+        db.session.execute(db.delete(TrendingProject))
+        if top:
+            db.session.execute(db.insert(TrendingProject), [
+                {'project_id': project_id, 'posicao': posicao, 'score': score, 'calculado_em': now}
+                for posicao, (project_id, score) in enumerate(top, start=1)
+            ])
+        db.session.commit()
+
+        for listener in self._refresh_listeners:
+            listener()
+        return len(top)
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='trending-ranker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self.app.app_context():
+                try:
+                    self.refresh()
+                except SQLAlchemyError:
+                    # Another worker rewriting the table at the same moment, or the database is away
+                    db.session.rollback()
+                    logger.exception('Falha ao recalcular o ranking de projetos em alta')
+                finally:
+                    db.session.remove()
+            time.sleep(self.interval)
+
+
+trending_ranker = TrendingRanker()
+
+
+def trending_projects(query, limit):
+    """The first limit projects of query in trending order"""
+    return (query.join(TrendingProject, TrendingProject.project_id == Project.id)
+            .order_by(TrendingProject.posicao).limit(limit).all())